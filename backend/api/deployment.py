@@ -4,216 +4,747 @@ Endpoints for model deployment
 from flask import request, jsonify
 import os
 import logging
-import json
-import traceback
+import math
+import orjson
+import functools
+import threading
+import collections
+import gc
+import time
+import uuid
 from datetime import datetime
-import geopandas as gpd
+import numpy as np
+from pyproj import Transformer
 
-from config import PROJECTS_DIR
-from services.deploy_service import ModelDeployer
+from config import PROJECTS_DIR, PIXEL_SIZE
+from services.deploy_service import (
+    ModelDeployer, TFLiteModel, bounding_box_feature, convert_model_to_tflite, release_inference_function,
+    get_region_bounds_info, get_region_centroid
+)
+from utils.helpers import json_response, geojson_bounds, write_file_atomic
 from tensorflow import keras
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of prediction features sent per deployment_feature_batch event
+FEATURE_BATCH_SIZE = 256
+
+# Largest region (query string or request body) accepted, in bytes; anything
+# bigger is rejected before it reaches the JSON parser
+MAX_REGION_BYTES = 256_000
+
+# Deployments hold a model, a fetch thread pool and inference batches in memory,
+# so only a few may run at once; further requests are rejected until one finishes
+MAX_CONCURRENT_DEPLOYMENTS = 2
+_deployment_slots = threading.BoundedSemaphore(MAX_CONCURRENT_DEPLOYMENTS)
+
+# Lock guarding the model caches, since Flask may serve concurrent requests
+_model_cache_lock = threading.Lock()
+
+# Number of loaded Keras models, and of converted TFLite model paths, kept cached
+MODEL_CACHE_SIZE = 8
+
+# Loaded Keras models keyed by (path, mtime), and converted TFLite model paths
+# keyed by (path, mtime, quantization), least recently used first. The
+# modification time is part of the key so that retraining a model (which
+# rewrites the .h5 file) automatically misses the cached copy.
+_model_cache = collections.OrderedDict()
+_tflite_path_cache = collections.OrderedDict()
+
+# Modification time each cached model path was last loaded at
+_loaded_model_mtimes = {}
+
+def _cache_store(cache, key, value):
+    """Add an entry to a model cache, evicting the least recently used beyond its size.
+    
+    Must be called with _model_cache_lock held.
+    
+    Returns:
+        list: Evicted values
+    """
+    cache[key] = value
+    cache.move_to_end(key)
+    evicted = []
+    while len(cache) > MODEL_CACHE_SIZE:
+        evicted.append(cache.popitem(last=False)[1])
+    return evicted
+
+def _release_stale_models(model_path, mtime):
+    """Drop the cached versions of a model once its file has been rewritten.
+    
+    Stale (path, mtime) entries would otherwise hold the old weights until they
+    age out of the LRU. Entries for other models stay warm. Must be called with
+    _model_cache_lock held.
+    
+    Args:
+        model_path (str): Path to the .h5 model file
+        mtime (float): Current modification time of the file
+    """
+    previous = _loaded_model_mtimes.get(model_path)
+    _loaded_model_mtimes[model_path] = mtime
+    if previous is not None and previous != mtime:
+        logger.info(f"Model {model_path} changed on disk, releasing its cached versions")
+        for key in [key for key in _model_cache if key[0] == model_path]:
+            release_inference_function(_model_cache.pop(key))
+        for key in [key for key in _tflite_path_cache if key[0] == model_path]:
+            del _tflite_path_cache[key]
+        gc.collect()
+
+# Locks held while one cache key's model is loaded or converted, so slow loads of
+# different models run in parallel while a duplicate request waits for the first
+_model_key_locks = {}
+
+def _get_or_build(cache, key, build, on_evict=None):
+    """Get a model cache entry, building it on a miss without blocking other keys.
+    
+    _model_cache_lock is only held to look up and insert the entry; the build
+    itself runs under a lock for this key alone.
+    
+    Args:
+        cache (OrderedDict): _model_cache or _tflite_path_cache
+        key (tuple): Cache key
+        build (callable): Builds the value on a miss
+        on_evict (callable, optional): Called with each value evicted by the insert
+        
+    Returns:
+        The cached or newly built value
+    """
+    with _model_cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        key_lock = _model_key_locks.setdefault(key, threading.Lock())
+    
+    with key_lock:
+        # Another request may have built the entry while this one waited
+        with _model_cache_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        try:
+            value = build()
+            with _model_cache_lock:
+                evicted = _cache_store(cache, key, value)
+        finally:
+            with _model_cache_lock:
+                _model_key_locks.pop(key, None)
+    for evicted_value in evicted:
+        if on_evict:
+            on_evict(evicted_value)
+    return value
+
+def _load_model_cached(model_path, mtime):
+    """Load a Keras model from disk, cached per (path, mtime)."""
+    def build():
+        logger.info(f"Loading model from {model_path}")
+        # Models are only used for inference, so skip rebuilding optimizer state
+        return keras.models.load_model(model_path, compile=False)
+    return _get_or_build(_model_cache, (model_path, mtime), build, on_evict=release_inference_function)
+
+def load_model(model_path, mtime=None):
+    """Get a loaded Keras model, reusing a cached copy when the file is unchanged.
+    
+    Args:
+        model_path (str): Path to the .h5 model file
+        mtime (float, optional): Modification time of the file, if already known
+            from an earlier stat. Defaults to reading it from disk.
+        
+    Returns:
+        keras.Model: The loaded model
+    """
+    if mtime is None:
+        mtime = os.path.getmtime(model_path)
+    with _model_cache_lock:
+        _release_stale_models(model_path, mtime)
+    return _load_model_cached(model_path, mtime)
+
+def _convert_tflite_model_cached(model_path, mtime, quantization):
+    """Get the path of a quantized TFLite version of a model, converting it first if needed."""
+    def build():
+        return convert_model_to_tflite(_load_model_cached(model_path, mtime), model_path, quantization)
+    return _get_or_build(_tflite_path_cache, (model_path, mtime, quantization), build)
+
+def load_tflite_model(model_path, mtime=None, quantization='fp16'):
+    """Get a quantized TFLite version of a model.
+    
+    The conversion is cached like load_model, but every call builds a new
+    interpreter, since interpreters are not thread-safe and deployments run
+    concurrently.
+    
+    Args:
+        model_path (str): Path to the .h5 model file
+        mtime (float, optional): Modification time of the file, if already known
+            from an earlier stat. Defaults to reading it from disk.
+        quantization (str): 'fp16' or 'int8'
+        
+    Returns:
+        TFLiteModel: The loaded TFLite model, for use by one deployment
+    """
+    if mtime is None:
+        mtime = os.path.getmtime(model_path)
+    with _model_cache_lock:
+        _release_stale_models(model_path, mtime)
+    tflite_path = _convert_tflite_model_cached(model_path, mtime, quantization)
+    logger.info(f"Loading TFLite model from {tflite_path}")
+    return TFLiteModel(tflite_path)
+
+# Schema for /deploy_model requests: field -> (accepted types, default).
+# Fields without a default are required.
+_DEPLOY_REQUEST_SCHEMA = {
+    'project_id': (str, None),
+    'model_name': (str, None),
+    'region': ((dict, str), None),
+    'start_date': (str, None),
+    'end_date': (str, None),
+    'pred_threshold': ((int, float), 0.5),
+    'clear_threshold': ((int, float), 0.75),
+    'max_workers': (int, 10),
+    'inference_batch_size': (int, 16),
+    'quantization': (str, 'none'),
+}
+
+# Supported values of the quantization request field
+_QUANTIZATION_MODES = ('none', 'fp16', 'int8')
+
+# Inclusive (min, max) bounds for numeric /deploy_model fields. max_workers sets
+# the tile fetch threads, and twice as many fetches are kept in flight;
+# inference_batch_size sets how many fetched tiles' chips are held for one
+# inference call.
+_DEPLOY_REQUEST_RANGES = {
+    'max_workers': (1, 32),
+    'inference_batch_size': (1, 64),
+}
+
+def _validate_deploy_request(data):
+    """Validate a /deploy_model request body against the deployment schema.
+    
+    Args:
+        data (dict): Parsed JSON request body
+        
+    Returns:
+        dict: Deployment parameters, with defaults filled in
+        
+    Raises:
+        ValueError: If the body is missing required fields, has the wrong types
+            or has numbers out of range
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Missing required parameters')
+    
+    params = {}
+    for field, (types, default) in _DEPLOY_REQUEST_SCHEMA.items():
+        value = data.get(field)
+        if value is None and default is not None:
+            value = default
+        elif default is None and not value:
+            raise ValueError('Missing required parameters')
+        elif not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError(f'Invalid value for {field}')
+        params[field] = value
+    for field, (minimum, maximum) in _DEPLOY_REQUEST_RANGES.items():
+        if not minimum <= params[field] <= maximum:
+            raise ValueError(f'Invalid value for {field}: expected {minimum} to {maximum}')
+    if params['quantization'] not in _QUANTIZATION_MODES:
+        raise ValueError(f"Invalid value for quantization: expected one of {', '.join(_QUANTIZATION_MODES)}")
+    params['region'] = _normalize_region(_parse_region(params['region']))
+    return params
+
+def _normalize_region(region):
+    """Reduce the accepted region forms to a bare GeoJSON Polygon or MultiPolygon.
+    
+    Bounds dicts become their Polygon and Features are unwrapped, so the rest of
+    the deployment only handles one shape.
+    
+    Args:
+        region (dict): Parsed region
+        
+    Returns:
+        dict: GeoJSON Polygon or MultiPolygon geometry
+        
+    Raises:
+        ValueError: If the region is not one of the accepted forms, a bounds dict
+            has non-numeric or inverted bounds, or polygon coordinates are malformed
+    """
+    if all(key in region for key in ('west', 'south', 'east', 'north')):
+        values = [region[key] for key in ('west', 'south', 'east', 'north')]
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+                   for value in values):
+            raise ValueError('Invalid region: west, south, east and north must be numbers')
+        west, south, east, north = values
+        if not (west < east and south < north):
+            raise ValueError('Invalid region: expected west < east and south < north')
+        return get_region_bounds_info(region)
+    if region.get('type') == 'Feature':
+        region = region.get('geometry') or {}
+    if region.get('type') not in ('Polygon', 'MultiPolygon') or not region.get('coordinates'):
+        raise ValueError('Invalid region: expected a GeoJSON Polygon or MultiPolygon')
+    if region['type'] == 'Polygon':
+        _validate_polygon_coordinates(region['coordinates'])
+    else:
+        if not isinstance(region['coordinates'], list):
+            raise ValueError('Invalid region: MultiPolygon coordinates must be a list of polygons')
+        for polygon in region['coordinates']:
+            _validate_polygon_coordinates(polygon)
+    return region
+
+def _validate_polygon_coordinates(rings):
+    """Check that a Polygon's coordinates are rings of numeric [x, y] positions.
+    
+    Args:
+        rings: Coordinates of a GeoJSON Polygon
+        
+    Raises:
+        ValueError: If there are no rings, a ring has fewer than 4 positions, or a
+            position is not a list of at least two finite numbers
+    """
+    if not isinstance(rings, list) or not rings:
+        raise ValueError('Invalid region: a polygon must be a non-empty list of rings')
+    for ring in rings:
+        if not isinstance(ring, list) or len(ring) < 4:
+            raise ValueError('Invalid region: each polygon ring needs at least 4 positions')
+        for position in ring:
+            if (not isinstance(position, list) or len(position) < 2
+                    or not all(isinstance(value, (int, float)) and not isinstance(value, bool)
+                               and math.isfinite(value) for value in position[:2])):
+                raise ValueError('Invalid region: positions must be [x, y] numbers')
+
+def _parse_region(raw):
+    """Parse a GeoJSON region from a request into a dict.
+    
+    Args:
+        raw (str | bytes | dict): GeoJSON text (e.g. a query parameter) or an
+            already parsed region
+        
+    Returns:
+        dict: Parsed region, or an empty dict if none was given
+        
+    Raises:
+        ValueError: If the text is not valid JSON or is not a JSON object
+    """
+    if isinstance(raw, dict):
+        return raw
+    if not raw:
+        return {}
+    try:
+        region = orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f'Invalid region: {e}')
+    if not isinstance(region, dict):
+        raise ValueError('Invalid region: expected a GeoJSON object')
+    return region
+
+# Formatters are stateless, so every deployment's log handler shares one
+_LOG_FORMATTER = logging.Formatter('%(levelname)s:%(name)s:%(message)s')
+
+class SocketIOLogHandler(logging.Handler):
+    """Log handler that buffers records and forwards them to the client in batches.
+    
+    Messages are sent as a single deployment_log_batch event per flush instead of
+    one socket frame per record. Only records tagged with the handler's job_id are
+    kept, since concurrent deployments log through the same logger.
+    """
+    def __init__(self, socketio, project_id, job_id, level=logging.INFO):
+        super().__init__(level)
+        self.setFormatter(_LOG_FORMATTER)
+        self.addFilter(lambda record: getattr(record, 'job_id', None) == job_id)
+        self.socketio = socketio
+        self.project_id = project_id
+        self.job_id = job_id
+        self.buffer = collections.deque()
+    
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        # Drain everything buffered so far into a single emit
+        messages = []
+        while self.buffer:
+            messages.append(self.buffer.popleft())
+        if messages:
+            self.socketio.emit('deployment_log_batch', {
+                'project_id': self.project_id,
+                'job_id': self.job_id,
+                'messages': messages
+            }, to=self.project_id)
+
+def _read_prediction_metadata(metadata_path):
+    """Read the metadata file saved with a prediction.
+    
+    Args:
+        metadata_path (str): Path of the metadata file
+        
+    Returns:
+        dict: The metadata, or None if the file is missing or cannot be parsed,
+            so callers fall back to the prediction GeoJSON
+    """
+    try:
+        with open(metadata_path, 'rb') as f:
+            metadata = orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except orjson.JSONDecodeError:
+        logger.warning(f"Ignoring unreadable prediction metadata {metadata_path}")
+        return None
+    return metadata if isinstance(metadata, dict) else None
+
+def _backfill_prediction_metadata(metadata_path, properties, feature_count):
+    """Write the metadata file for a prediction saved before they existed.
+    
+    Later listings then read the small metadata file instead of the full GeoJSON.
+    Failures are logged and ignored, since the GeoJSON remains the source of truth.
+    
+    Args:
+        metadata_path (str): Path of the metadata file to create
+        properties (dict): Top-level properties of the prediction GeoJSON
+        feature_count (int): Number of features in the prediction
+    """
+    metadata = {
+        key: properties[key]
+        for key in ('model_name', 'start_date', 'end_date', 'region_bounds')
+        if key in properties
+    }
+    metadata['feature_count'] = feature_count
+    try:
+        write_file_atomic(metadata_path, orjson.dumps(metadata))
+    except OSError as e:
+        logger.warning(f"Could not write prediction metadata {metadata_path}: {e}")
+
+@functools.lru_cache(maxsize=64)
+def _utm_transformers(utm_crs):
+    """Build the WGS84 <-> UTM transformers for a zone, once per zone.
+    
+    Args:
+        utm_crs (str): EPSG code of the UTM zone, e.g. "EPSG:32610"
+        
+    Returns:
+        tuple: (to_utm, to_wgs84) pyproj Transformers using lon/lat axis order
+    """
+    return (
+        Transformer.from_crs("EPSG:4326", utm_crs, always_xy=True),
+        Transformer.from_crs(utm_crs, "EPSG:4326", always_xy=True)
+    )
+
+@functools.lru_cache(maxsize=256)
+def _compute_deployment_tiles(region_key, tile_size, overlap):
+    """Compute the deployment tile grid for a region, cached per region.
+    
+    The client requests the same grid repeatedly while the user adjusts the
+    view, so the grid is memoized on the region's canonical JSON encoding.
+    
+    Args:
+        region_key (bytes): Region GeoJSON serialized with sorted keys
+        tile_size (int): Tile size in pixels
+        overlap (float): Fractional overlap between adjacent tiles
+        
+    Returns:
+        dict: Compact tile arrays and grid dimensions. Shared between callers,
+            so it must not be modified.
+    """
+    region = orjson.loads(region_key)
+    
+    # Get region in projected coordinate system
+    # Use UTM projection appropriate for the region's centroid, computed locally
+    region_centroid = get_region_centroid(region)
+    utm_zone = int((180 + region_centroid[0]) / 6) + 1
+    utm_crs = f"EPSG:{32600 + utm_zone}"  # Northern hemisphere as default
+    
+    # If in southern hemisphere, adjust EPSG code
+    if region_centroid[1] < 0:
+        utm_crs = f"EPSG:{32700 + utm_zone}"
+    
+    # Get region bounds in the UTM projection for true distance calculations
+    bounds_coords = get_region_bounds_info(region)['coordinates'][0]
+    
+    # Project the corners to UTM for accurate distance measurements
+    to_utm, to_wgs84 = _utm_transformers(utm_crs)
+    bounds_lon, bounds_lat = np.asarray(bounds_coords, dtype=np.float64).T
+    bounds_x, bounds_y = to_utm.transform(bounds_lon, bounds_lat)
+    min_x, max_x = float(np.min(bounds_x)), float(np.max(bounds_x))
+    min_y, max_y = float(np.min(bounds_y)), float(np.max(bounds_y))
+    
+    # Get dimensions in meters directly
+    width_meters = max_x - min_x
+    height_meters = max_y - min_y
+    
+    # Calculate scale based on the collection
+    scale = PIXEL_SIZE['S2']  # 10m resolution
+    
+    # Calculate dimensions in pixels
+    width_pixels = int(width_meters / scale)
+    height_pixels = int(height_meters / scale)
+    
+    # Calculate effective stride to implement overlap
+    stride_factor = 1 - overlap
+    stride_meters = tile_size * scale * stride_factor
+    
+    # Calculate number of tiles with overlap
+    n_tiles_x = max(1, int(width_meters / stride_meters) + (0 if width_meters % stride_meters == 0 else 1))
+    n_tiles_y = max(1, int(height_meters / stride_meters) + (0 if height_meters % stride_meters == 0 else 1))
+    
+    # Compute the UTM bounds of every tile at once (row-major: y outer, x inner)
+    tile_extent = tile_size * scale
+    grid_x, grid_y = np.meshgrid(np.arange(n_tiles_x), np.arange(n_tiles_y))
+    grid_x, grid_y = grid_x.ravel(), grid_y.ravel()
+    x_min_utm = min_x + grid_x * stride_meters
+    y_min_utm = min_y + grid_y * stride_meters
+    x_max_utm = np.minimum(x_min_utm + tile_extent, max_x)
+    y_max_utm = np.minimum(y_min_utm + tile_extent, max_y)
+    
+    # Closed corner rings for every tile, shape (n_tiles, 5)
+    ring_x = np.stack([x_min_utm, x_max_utm, x_max_utm, x_min_utm, x_min_utm], axis=1)
+    ring_y = np.stack([y_min_utm, y_min_utm, y_max_utm, y_max_utm, y_min_utm], axis=1)
+    
+    # Convert all corners back to WGS84 (EPSG:4326) in a single reprojection
+    corners_lon, corners_lat = to_wgs84.transform(ring_x.ravel(), ring_y.ravel())
+    
+    # Pack the tile grid into compact arrays instead of one nested dict per tile:
+    # closed lon/lat rings (n_tiles, 5, 2), grid indices (n_tiles, 2) as [x, y],
+    # and UTM bounds (n_tiles, 4) as [x_min, y_min, x_max, y_max]
+    tile_coords = np.empty(ring_x.shape + (2,), dtype=np.float64)
+    tile_coords[..., 0] = np.reshape(corners_lon, ring_x.shape)
+    tile_coords[..., 1] = np.reshape(corners_lat, ring_y.shape)
+    tile_indices = np.stack([grid_x, grid_y], axis=1)
+    tile_bounds_utm = np.stack([x_min_utm, y_min_utm, x_max_utm, y_max_utm], axis=1)
+    
+    return {
+        "tile_coords": tile_coords,
+        "tile_indices": tile_indices,
+        "tile_bounds_utm": tile_bounds_utm,
+        "dimensions": {
+            "width_pixels": width_pixels,
+            "height_pixels": height_pixels,
+            "n_tiles_x": n_tiles_x,
+            "n_tiles_y": n_tiles_y,
+            "meters_per_pixel": scale,
+            "overlap_percent": overlap * 100,
+            "crs": {
+                "geographic": "EPSG:4326",
+                "projected": utm_crs
+            }
+        }
+    }
+
 def register_deployment_endpoints(app, socketio):
     """Register all deployment-related endpoints"""
     
+    def run_deployment(job_id, params):
+        """Run a model deployment in the background, reporting through Socket.IO.
+        
+        Args:
+            job_id (str): ID of the deployment job, included in every emitted event
+            params (dict): Validated deployment parameters from the request
+        """
+        project_id = params['project_id']
+        model_name = params['model_name']
+        region = params['region']
+        start_date = params['start_date']
+        end_date = params['end_date']
+        pred_threshold = params['pred_threshold']
+        clear_threshold = params['clear_threshold']
+        
+        try:
+            # Load the model (cached across requests), as a quantized TFLite model if requested
+            if params['quantization'] != 'none':
+                model = load_tflite_model(params['model_path'], params['model_mtime'], params['quantization'])
+            else:
+                model = load_model(params['model_path'], params['model_mtime'])
+            
+            # Create deployer instance, tagging its log records with this job's ID
+            deployer = ModelDeployer(project_id, chip_size=512, job_id=job_id)
+            
+            # Stream newly predicted features to the client in fixed-size batches as
+            # tiles complete, so it can render progressively
+            pending_features = []
+            
+            def emit_feature_batches(flush_all=False):
+                while len(pending_features) >= FEATURE_BATCH_SIZE or (flush_all and pending_features):
+                    batch = pending_features[:FEATURE_BATCH_SIZE]
+                    del pending_features[:FEATURE_BATCH_SIZE]
+                    socketio.emit('deployment_feature_batch', {
+                        'project_id': project_id,
+                        'job_id': job_id,
+                        'predictions': {
+                            "type": "FeatureCollection",
+                            "features": batch,
+                            "properties": {
+                                "start_date": start_date,
+                                "end_date": end_date,
+                                "model_name": model_name
+                            }
+                        },
+                        'bounding_box': progress_state['bounding_box']
+                    }, to=project_id)
+            
+            # Throttle progress updates: emit at most every 250ms or whenever the
+            # whole-percent progress changes, and always emit the final tile.
+            # Buffered features are flushed along with each progress update.
+            progress_state = {'last_time': 0.0, 'last_percent': -1, 'bounding_box': None}
+            progress_lock = threading.Lock()
+            
+            def progress_callback(current, total, incremental_predictions=None, bounding_box=None):
+                # Serialize updates in case tiles report from several worker threads
+                with progress_lock:
+                    if bounding_box:
+                        progress_state['bounding_box'] = bounding_box
+                    if incremental_predictions:
+                        pending_features.extend(incremental_predictions['features'])
+                        emit_feature_batches()
+                    
+                    now = time.monotonic()
+                    percent = int(current * 100 / total)
+                    if (current < total
+                            and now - progress_state['last_time'] < 0.25
+                            and percent == progress_state['last_percent']):
+                        return
+                    progress_state['last_time'] = now
+                    progress_state['last_percent'] = percent
+                    
+                    emit_feature_batches(flush_all=True)
+                    socketio.emit('deployment_progress', {
+                        'project_id': project_id,
+                        'job_id': job_id,
+                        'progress': current / total,
+                        'status': f'Processing tile {current} of {total}',
+                        'details': {
+                            'current': current,
+                            'total': total,
+                            'region': 'Custom region',
+                            'start_date': start_date,
+                            'end_date': end_date
+                        }
+                    }, to=project_id)
+            
+            # Forward buffered log messages every 100ms while predictions run
+            log_forwarding_done = threading.Event()
+            
+            def forward_logs():
+                while not log_forwarding_done.is_set():
+                    socket_handler.flush()
+                    socketio.sleep(0.1)
+            
+            # Attach the Socket.IO handler to the deployer's logger inside the try,
+            # so the finally below always detaches it again
+            socket_handler = SocketIOLogHandler(socketio, project_id, job_id)
+            try:
+                deployer.logger.logger.addHandler(socket_handler)
+                socketio.start_background_task(forward_logs)
+                
+                # Make predictions
+                num_predictions = deployer.make_predictions(
+                    model=model,
+                    region=region,
+                    start_date=start_date,
+                    end_date=end_date,
+                    pred_threshold=pred_threshold,
+                    clear_threshold=clear_threshold,
+                    model_name=model_name,
+                    progress_callback=progress_callback,
+                    max_workers=params['max_workers'],
+                    inference_batch_size=params['inference_batch_size'],
+                    region_bounds=params['region_bounds']
+                )
+            finally:
+                # Stop forwarding, send any remaining messages and remove the handler
+                log_forwarding_done.set()
+                socket_handler.flush()
+                deployer.logger.logger.removeHandler(socket_handler)
+            
+            # Create bounding box as a GeoJSON feature
+            bounding_box = bounding_box_feature(params['region_bounds'], start_date, end_date, model_name)
+            
+            # Emit completion event. Every predicted feature has already been
+            # streamed in deployment_feature_batch events, so only a summary is sent.
+            socketio.emit('deployment_complete', {
+                'project_id': project_id,
+                'job_id': job_id,
+                'num_predictions': num_predictions,
+                'bounding_box': bounding_box
+            }, to=project_id)
+            
+        except Exception as e:
+            logger.exception(f"Error deploying model: {str(e)}")
+            socketio.emit('deployment_error', {
+                'project_id': project_id,
+                'job_id': job_id,
+                'error': str(e)
+            }, to=project_id)
+        finally:
+            _deployment_slots.release()
+
     @app.route('/deploy_model', methods=['POST'])
     def deploy_model():
-        """Deploy a trained model to make predictions on a region."""
+        """Start deploying a trained model to make predictions on a region.
+        
+        The deployment runs as a background task so the request returns immediately
+        with a job ID; progress and results are delivered via Socket.IO events.
+        """
         try:
-            data = request.get_json()
-            project_id = data.get('project_id')
-            model_name = data.get('model_name')
-            region = data.get('region')
-            start_date = data.get('start_date')
-            end_date = data.get('end_date')
-            pred_threshold = data.get('pred_threshold', 0.5)
-            clear_threshold = data.get('clear_threshold', 0.75)
-            
-            if not all([project_id, model_name, region, start_date, end_date]):
+            if request.content_length and request.content_length > MAX_REGION_BYTES:
                 return jsonify({
                     'success': False,
-                    'message': 'Missing required parameters'
-                })
+                    'message': f'Request body exceeds {MAX_REGION_BYTES} bytes'
+                }), 413
+            try:
+                try:
+                    data = orjson.loads(request.get_data(cache=False))
+                except orjson.JSONDecodeError:
+                    raise ValueError('Request body must be valid JSON')
+                params = _validate_deploy_request(data)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
             
             # Get the model file path
-            model_path = os.path.join(PROJECTS_DIR, project_id, 'models', f'{model_name}.h5')
-            if not os.path.exists(model_path):
+            model_path = os.path.join(PROJECTS_DIR, params['project_id'], 'models', f"{params['model_name']}.h5")
+            
+            # A single stat serves both the existence check and the model cache key
+            try:
+                model_stat = os.stat(model_path)
+            except FileNotFoundError:
                 return jsonify({
                     'success': False,
                     'message': f'Model file not found: {model_path}'
-                })
-            
-            # Load the model
-            model = keras.models.load_model(model_path)
-            
-            # Create deployer instance
-            deployer = ModelDeployer(project_id, chip_size=512)
-            
-            # Set up a custom log handler to capture and forward log messages
-            class SocketIOLogHandler(logging.Handler):
-                def emit(self, record):
-                    try:
-                        log_message = self.format(record)
-                        if record.levelno >= logging.INFO:
-                            socketio.emit('deployment_log', {
-                                'project_id': project_id,
-                                'message': log_message
-                            })
-                    except Exception:
-                        self.handleError(record)
-            
-            # Add the custom handler to the deployer's logger
-            socket_handler = SocketIOLogHandler()
-            socket_handler.setLevel(logging.INFO)
-            formatter = logging.Formatter('%(levelname)s:%(name)s:%(message)s')
-            socket_handler.setFormatter(formatter)
-            deployer.logger.addHandler(socket_handler)
-            
-            # Make predictions
-            predictions = deployer.make_predictions(
-                model=model,
-                region=region,
-                start_date=start_date,
-                end_date=end_date,
-                pred_threshold=pred_threshold,
-                clear_threshold=clear_threshold,
-                model_name=model_name,
-                progress_callback=lambda current, total, incremental_predictions=None, bounding_box=None: socketio.emit('deployment_progress', {
-                    'project_id': project_id,
-                    'progress': current / total,
-                    'status': f'Processing tile {current} of {total}',
-                    'details': {
-                        'current': current,
-                        'total': total,
-                        'region': 'Custom region',
-                        'start_date': start_date,
-                        'end_date': end_date
-                    },
-                    'incremental_predictions': incremental_predictions,
-                    'bounding_box': bounding_box
-                })
-            )
-            
-            # Remove the custom handler
-            deployer.logger.removeHandler(socket_handler)
-            
-            # Convert predictions to GeoJSON
-            predictions_geojson = predictions.to_json()
-            
-            # Parse the GeoJSON and ensure it's valid before sending
-            prediction_data = json.loads(predictions_geojson)
-            
-            # Validate GeoJSON structure
-            if 'features' not in prediction_data:
-                prediction_data = {"type": "FeatureCollection", "features": []}
-            
-            # Calculate bounding box from region
-            region_ee = deployer.get_region_bounds(region)
-            bounds = region_ee.bounds().getInfo()
-            app.logger.info(f"Calculated bounds: {bounds}")  # Debug log
-            
-            # Create bounding box as a GeoJSON feature
-            # Use the coordinates directly from the bounds
-            bounding_box = {
-                'type': 'Feature',
-                'geometry': {
-                    'type': 'Polygon',
-                    'coordinates': bounds['coordinates']  # Use the coordinates directly
-                },
-                'properties': {
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'model_name': model_name
-                }
-            }
-            
-            app.logger.info(f"Created bounding box: {bounding_box}")  # Debug log
-            
-            # Ensure bounding_box has a valid structure for the client to use
-            if not bounding_box or 'geometry' not in bounding_box:
-                # Default to a small area if bounding box is invalid
-                app.logger.warning("Invalid bounding box - using default")
-                
-                # Create a bounding box from the region if possible
-                try:
-                    if isinstance(region, dict):
-                        if 'type' in region and region['type'] == 'Polygon':
-                            # Already a polygon, use it directly
-                            bounding_box = {
-                                "type": "Feature",
-                                "geometry": region,
-                                "properties": {
-                                    'start_date': start_date,
-                                    'end_date': end_date,
-                                    'model_name': model_name
-                                }
-                            }
-                        elif 'west' in region and 'north' in region and 'east' in region and 'south' in region:
-                            # It's a bounds object with west/east/north/south
-                            bounding_box = {
-                                "type": "Feature",
-                                "geometry": {
-                                    "type": "Polygon",
-                                    "coordinates": [
-                                        [
-                                            [region["west"], region["north"]], 
-                                            [region["east"], region["north"]], 
-                                            [region["east"], region["south"]], 
-                                            [region["west"], region["south"]], 
-                                            [region["west"], region["north"]]
-                                        ]
-                                    ]
-                                },
-                                "properties": {
-                                    'start_date': start_date,
-                                    'end_date': end_date,
-                                    'model_name': model_name
-                                }
-                            }
-                        else:
-                            # Can't determine format, use default
-                            raise ValueError("Unknown region format")
-                    else:
-                        raise ValueError("Region is not a dictionary")
-                except Exception as e:
-                    app.logger.error(f"Error creating bounding box: {str(e)}")
-                    # Use a small default area
-                    bounding_box = {
-                        "type": "Feature",
-                        "geometry": {
-                            "type": "Polygon",
-                            "coordinates": [[[-0.1, -0.1], [0.1, -0.1], [0.1, 0.1], [-0.1, 0.1], [-0.1, -0.1]]]
-                        },
-                        "properties": {
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'model_name': model_name
-                        }
-                    }
+                }), 404
+            params['model_path'] = model_path
+            params['model_mtime'] = model_stat.st_mtime
+            
+            # Normalize the region to its bounding box up front, so an unusable region
+            # is rejected here and the deployment shares the result
+            try:
+                params['region_bounds'] = get_region_bounds_info(params['region'])
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'Invalid region: {str(e)}'
+                }), 400
+            logger.info(f"Calculated bounds: {params['region_bounds']}")
             
-            # Emit completion event
-            socketio.emit('deployment_complete', {
-                'project_id': project_id,
-                'num_predictions': len(predictions),
-                'predictions': prediction_data,
-                'bounding_box': bounding_box
-            })
+            # Run the deployment in the background and return right away; the slot
+            # is released by run_deployment when it finishes
+            if not _deployment_slots.acquire(blocking=False):
+                return jsonify({
+                    'success': False,
+                    'message': f'Too many deployments running (limit {MAX_CONCURRENT_DEPLOYMENTS}), try again when one finishes'
+                }), 429
+            job_id = uuid.uuid4().hex
+            try:
+                socketio.start_background_task(run_deployment, job_id, params)
+            except Exception:
+                _deployment_slots.release()
+                raise
             
             return jsonify({
                 'success': True,
-                'predictions': prediction_data,
-                'bounding_box': bounding_box
-            })
+                'job_id': job_id
+            }), 202
             
         except Exception as e:
-            logger.error(f"Error deploying model: {str(e)}")
-            logger.error(traceback.format_exc())
-            socketio.emit('deployment_error', {
-                'project_id': project_id,
-                'error': str(e)
-            })
+            logger.exception(f"Error starting deployment: {str(e)}")
             return jsonify({
                 'success': False,
                 'message': str(e)
@@ -224,7 +755,15 @@ def register_deployment_endpoints(app, socketio):
         try:
             # Get parameters from query string
             project_id = request.args.get('project_id', '')
-            region = json.loads(request.args.get('region', '{}'))
+            raw_region = request.args.get('region')
+            if raw_region and len(raw_region) > MAX_REGION_BYTES:
+                return jsonify({"success": False, "message": f"Region exceeds {MAX_REGION_BYTES} bytes"}), 413
+            try:
+                region = _parse_region(raw_region)
+                if region:
+                    region = _normalize_region(region)
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
             tile_size = 512
             overlap = 0.5  # 50% overlap between adjacent tiles
             
@@ -236,134 +775,14 @@ def register_deployment_endpoints(app, socketio):
             if not os.path.exists(project_dir) or not os.path.isdir(project_dir):
                 return jsonify({"success": False, "message": f"Project '{project_id}' not found"}), 404
             
-            # Initialize Earth Engine for proper geographic handling
-            # Use the ModelDeployer from deploy_service
-            from config import PIXEL_SIZE
-            deployer = ModelDeployer(
-                project_id=project_id,
-                collection='S2',
-                chip_size=tile_size
-            )
-            
-            # Convert region to ee.Geometry
-            region_ee = deployer.get_region_bounds(region)
-            
-            # Get region in projected coordinate system
-            # Use UTM projection appropriate for the region's centroid
-            region_centroid = region_ee.centroid().coordinates().getInfo()
-            utm_zone = int((180 + region_centroid[0]) / 6) + 1
-            utm_crs = f"EPSG:{32600 + utm_zone}"  # Northern hemisphere as default
-            
-            # If in southern hemisphere, adjust EPSG code
-            if region_centroid[1] < 0:
-                utm_crs = f"EPSG:{32700 + utm_zone}"
-            
-            # Get region bounds in the UTM projection for true distance calculations
-            bounds = region_ee.bounds()
-            bounds_coords = bounds.getInfo()['coordinates'][0]
-            
-            # Create a GeoDataFrame for proper projection handling
-            bounds_gdf = gpd.GeoDataFrame(
-                geometry=[
-                    gpd.geometry.Polygon(bounds_coords)
-                ], 
-                crs="EPSG:4326"
+            # Sorted keys give equal regions the same cache key regardless of key order
+            tiles = _compute_deployment_tiles(
+                orjson.dumps(region, option=orjson.OPT_SORT_KEYS), tile_size, overlap
             )
-            
-            # Project to UTM for accurate distance measurements
-            bounds_utm = bounds_gdf.to_crs(utm_crs)
-            
-            # Get dimensions in meters using the UTM projection
-            bounds_utm_coords = bounds_utm.geometry[0].exterior.coords.xy
-            min_x, max_x = min(bounds_utm_coords[0]), max(bounds_utm_coords[0])
-            min_y, max_y = min(bounds_utm_coords[1]), max(bounds_utm_coords[1])
-            
-            # Get dimensions in meters directly
-            width_meters = max_x - min_x
-            height_meters = max_y - min_y
-            
-            # Calculate scale based on the collection
-            scale = PIXEL_SIZE['S2']  # 10m resolution
-            
-            # Calculate dimensions in pixels
-            width_pixels = int(width_meters / scale)
-            height_pixels = int(height_meters / scale)
-            
-            # Calculate effective stride to implement overlap
-            stride_factor = 1 - overlap
-            stride_meters = tile_size * scale * stride_factor
-            
-            # Calculate number of tiles with overlap
-            n_tiles_x = max(1, int(width_meters / stride_meters) + (0 if width_meters % stride_meters == 0 else 1))
-            n_tiles_y = max(1, int(height_meters / stride_meters) + (0 if height_meters % stride_meters == 0 else 1))
-            
-            # Generate tile geometries
-            tiles = []
-            
-            for y in range(n_tiles_y):
-                for x in range(n_tiles_x):
-                    # Calculate tile bounds in meters (UTM)
-                    x_min_utm = min_x + x * stride_meters
-                    y_min_utm = min_y + y * stride_meters
-                    x_max_utm = min(x_min_utm + (tile_size * scale), max_x)
-                    y_max_utm = min(y_min_utm + (tile_size * scale), max_y)
-                    
-                    # Create tile polygon in UTM
-                    tile_utm = gpd.GeoDataFrame(
-                        geometry=[
-                            gpd.geometry.Polygon([
-                                (x_min_utm, y_min_utm),
-                                (x_max_utm, y_min_utm),
-                                (x_max_utm, y_max_utm),
-                                (x_min_utm, y_max_utm),
-                                (x_min_utm, y_min_utm)
-                            ])
-                        ],
-                        crs=utm_crs
-                    )
-                    
-                    # Convert back to WGS84 (EPSG:4326) for compatibility
-                    tile_wgs84 = tile_utm.to_crs("EPSG:4326")
-                    tile_coords = list(tile_wgs84.geometry[0].exterior.coords)
-                    
-                    # Create GeoJSON feature for the tile
-                    tiles.append({
-                        'geometry': {
-                            'type': 'Polygon',
-                            'coordinates': [[(coord[0], coord[1]) for coord in tile_coords]]
-                        },
-                        'properties': {
-                            'tile_id': f"{x}_{y}",
-                            'x': x,
-                            'y': y,
-                            'x_min_utm': float(x_min_utm),
-                            'y_min_utm': float(y_min_utm),
-                            'x_max_utm': float(x_max_utm),
-                            'y_max_utm': float(y_max_utm),
-                            'utm_crs': utm_crs
-                        }
-                    })
-            
-            return jsonify({
-                "success": True,
-                "tiles": tiles,
-                "dimensions": {
-                    "width_pixels": width_pixels,
-                    "height_pixels": height_pixels,
-                    "n_tiles_x": n_tiles_x,
-                    "n_tiles_y": n_tiles_y,
-                    "meters_per_pixel": scale,
-                    "overlap_percent": overlap * 100,
-                    "crs": {
-                        "geographic": "EPSG:4326",
-                        "projected": utm_crs
-                    }
-                }
-            })
+            return json_response({"success": True, **tiles})
             
         except Exception as e:
-            logger.error(f"Error generating deployment tiles: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception(f"Error generating deployment tiles: {str(e)}")
             return jsonify({"success": False, "message": str(e)}), 500
 
     @app.route('/get_predictions', methods=['GET'])
@@ -377,31 +796,40 @@ def register_deployment_endpoints(app, socketio):
                     'message': 'Missing project_id parameter'
                 })
             
-            # Get the predictions directory
+            # Scan the predictions directory; each entry caches its own stat result
             predictions_dir = os.path.join(PROJECTS_DIR, project_id, 'predictions')
-            if not os.path.exists(predictions_dir):
+            try:
+                prediction_entries = [
+                    entry for entry in os.scandir(predictions_dir)
+                    if entry.name.endswith('.geojson') and entry.is_file()
+                ]
+            except FileNotFoundError:
                 return jsonify({
                     'success': True,
                     'predictions': []
                 })
             
-            # List all prediction files
-            prediction_files = [f for f in os.listdir(predictions_dir) if f.endswith('.geojson')]
             predictions = []
             
-            for filename in prediction_files:
-                file_path = os.path.join(predictions_dir, filename)
+            for entry in prediction_entries:
+                filename = entry.name
                 try:
-                    # Read the GeoJSON file
-                    with open(file_path, 'r') as f:
-                        geojson = json.load(f)
-                    
-                    # Extract metadata from the file
-                    properties = geojson.get('properties', {})
-                    feature_count = len(geojson.get('features', []))
+                    # Read the small metadata file saved with the prediction, falling
+                    # back to parsing the full GeoJSON for predictions saved without one
+                    # (or with one that cannot be parsed), which then gets rewritten
+                    metadata_path = entry.path.replace('.geojson', '_metadata.json')
+                    properties = _read_prediction_metadata(metadata_path)
+                    if properties is not None:
+                        feature_count = properties.get('feature_count', 0)
+                    else:
+                        with open(entry.path, 'rb') as f:
+                            geojson = orjson.loads(f.read())
+                        properties = geojson.get('properties', {})
+                        feature_count = len(geojson.get('features', []))
+                        _backfill_prediction_metadata(metadata_path, properties, feature_count)
                     
                     # Get file creation time
-                    created = datetime.fromtimestamp(os.path.getctime(file_path)).isoformat()
+                    created = datetime.fromtimestamp(entry.stat().st_ctime).isoformat()
                     
                     # Extract timestamp from filename
                     timestamp = filename.replace('predictions_', '').replace('.geojson', '')
@@ -421,7 +849,7 @@ def register_deployment_endpoints(app, socketio):
             # Sort predictions by creation time (newest first)
             predictions.sort(key=lambda x: x['created'], reverse=True)
             
-            return jsonify({
+            return json_response({
                 'success': True,
                 'predictions': predictions
             })
@@ -456,9 +884,33 @@ def register_deployment_endpoints(app, socketio):
                     'message': f'Prediction file not found: {file_path}'
                 })
             
+            # Predictions saved with a metadata file already record their region bounds,
+            # so the GeoJSON is passed through as raw bytes instead of being parsed and
+            # re-serialized
+            metadata = _read_prediction_metadata(file_path.replace('.geojson', '_metadata.json'))
+            if metadata is not None and 'region_bounds' in metadata:
+                properties = {
+                    key: metadata[key]
+                    for key in ('start_date', 'end_date', 'model_name', 'region_bounds')
+                    if key in metadata
+                }
+                bounds = {
+                    'type': 'Feature',
+                    'geometry': {
+                        'type': 'Polygon',
+                        'coordinates': metadata['region_bounds']['coordinates']
+                    },
+                    'properties': properties
+                }
+                with open(file_path, 'rb') as f:
+                    prediction_bytes = f.read()
+                body = (b'{"success":true,"prediction":' + prediction_bytes
+                        + b',"bounding_box":' + orjson.dumps(bounds) + b'}')
+                return json_response(body)
+            
             # Read the GeoJSON file
-            with open(file_path, 'r') as f:
-                geojson = json.load(f)
+            with open(file_path, 'rb') as f:
+                geojson = orjson.loads(f.read())
             
             # Get the properties which should contain the original bounding box information
             properties = geojson.get('properties', {})
@@ -476,14 +928,12 @@ def register_deployment_endpoints(app, socketio):
                     },
                     'properties': properties
                 }
-            # Otherwise, calculate bounds from features as a fallback
+            # Otherwise, calculate bounds from the feature coordinates as a fallback
             elif geojson.get('features'):
                 try:
-                    # Create a GeoDataFrame from the features
-                    gdf = gpd.GeoDataFrame.from_features(geojson)
-                    if not gdf.empty:
-                        # Get the total bounds
-                        minx, miny, maxx, maxy = gdf.total_bounds
+                    feature_bounds = geojson_bounds(geojson)
+                    if feature_bounds:
+                        minx, miny, maxx, maxy = feature_bounds
                         bounds = {
                             'type': 'Feature',
                             'geometry': {
@@ -503,7 +953,7 @@ def register_deployment_endpoints(app, socketio):
                 except Exception as e:
                     app.logger.error(f"Error calculating bounds: {str(e)}")
             
-            return jsonify({
+            return json_response({
                 'success': True,
                 'prediction': geojson,
                 'bounding_box': bounds
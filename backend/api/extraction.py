@@ -8,28 +8,347 @@ import json
 import logging
 import base64
 import io
+import functools
+import threading
+import collections
+import concurrent.futures
+import time
+import orjson
 from PIL import Image
 import numpy as np
+import geopandas as gpd
 import xarray as xr
-import matplotlib.pyplot as plt
-import matplotlib.colors as colors
 import traceback
 
 from config import PROJECTS_DIR, PIXEL_SIZE
 from services.gee_service import GEEDataExtractor
+from utils.helpers import json_response, geometry_bounds, write_file_atomic
 
 logger = logging.getLogger(__name__)
 
-# Helper class for NumPy serialization
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super(NumpyEncoder, self).default(obj)
+def _build_ndvi_lut(size=1024):
+    """Precompute the NDVI colormap as a lookup table of 8-bit RGB colors.
+    
+    Args:
+        size (int): Number of entries spanning NDVI values 0 to 1
+        
+    Returns:
+        np.ndarray: (size, 3) uint8 array of RGB colors
+    """
+    # Define the NDVI colormap (similar to RdYlGn)
+    # Colors from red (0) to green (1)
+    control_colors = np.array([
+        [0.84, 0.19, 0.15],  # dark red
+        [0.99, 0.55, 0.35],  # light red
+        [0.99, 0.88, 0.55],  # yellow
+        [0.85, 0.94, 0.55],  # light green
+        [0.57, 0.81, 0.38],  # medium green
+        [0.10, 0.60, 0.31]   # dark green
+    ])
+    control_positions = np.linspace(0, 1, len(control_colors))
+    positions = np.linspace(0, 1, size)
+    lut = np.stack(
+        [np.interp(positions, control_positions, control_colors[:, c]) for c in range(3)],
+        axis=-1
+    )
+    return (lut * 255).astype(np.uint8)
+
+# NDVI colormap, built once at import instead of interpolated per patch
+NDVI_LUT = _build_ndvi_lut()
+
+def _render_patches(chips, bands, collection, visualization_type):
+    """Render a stack of chips as RGB images for display.
+    
+    Band positions are looked up once and every chip is scaled in the same NumPy
+    operation, rather than patch by patch.
+    
+    Args:
+        chips (np.ndarray): Chips with shape (n, height, width, bands)
+        bands (list): Band names, in the order of the chips' last axis
+        collection (str): 'S2' or 'S1'
+        visualization_type (str): 'true_color', 'false_color' or 'ndvi' (S2 only)
+        
+    Returns:
+        np.ndarray: (n, height, width, 3) uint8 RGB images, or None if the
+            bands needed are not in the dataset
+    """
+    band_index = {band: i for i, band in enumerate(bands)}
+    nir_idx = band_index.get('B8', band_index.get('B8A'))
+    
+    if collection == 'S2':
+        if visualization_type == 'true_color':
+            # True color: RGB (B4, B3, B2)
+            channels = [band_index.get('B4'), band_index.get('B3'), band_index.get('B2')]
+            scales = [3000, 3000, 3000]
+        elif visualization_type == 'false_color':
+            # False color: NIR, Red, Green (B8, B4, B3)
+            channels = [nir_idx, band_index.get('B4'), band_index.get('B3')]
+            scales = [5000, 3000, 3000]
+        elif visualization_type == 'ndvi':
+            red_idx = band_index.get('B4')
+            if nir_idx is None or red_idx is None:
+                return None
+            nir = chips[..., nir_idx].astype(np.float32)
+            red = chips[..., red_idx].astype(np.float32)
+            
+            # Reuse the two band buffers for the sum and difference, and write the
+            # ratio into the difference; pixels with no signal stay at 0
+            difference = nir - red
+            denominator = np.add(nir, red, out=nir)
+            ndvi = np.divide(difference, denominator, out=np.zeros_like(red), where=denominator > 0)
+            
+            # Scale NDVI to lookup table positions and clip in place, keeping [0, 1]
+            # as negative ndvi values are atypical, then map them to colors with a
+            # single lookup table gather
+            np.multiply(ndvi, len(NDVI_LUT) - 1, out=ndvi)
+            np.clip(ndvi, 0, len(NDVI_LUT) - 1, out=ndvi)
+            return NDVI_LUT[ndvi.astype(np.uint16)]
+        else:
+            return None
+    elif collection == 'S1':
+        # Simple RGB composite using VV for red and green, VH for blue,
+        # scaled by the typical range of each band
+        channels = [band_index.get('VV'), band_index.get('VV'), band_index.get('VH')]
+        scales = [0.3, 0.3, 0.1]
+    else:
+        return None
+    
+    if None in channels:
+        return None
+    # Scale straight to the 8-bit range in place in one float32 buffer, then cast,
+    # so the encode path only moves bytes
+    rgb = np.take(chips, channels, axis=-1).astype(np.float32, copy=False)
+    np.multiply(rgb, 255.0 / np.array(scales, dtype=np.float32), out=rgb)
+    np.clip(rgb, 0, 255, out=rgb)
+    return rgb.astype(np.uint8)
+
+def _read_json_file(file_path):
+    """Read a small JSON file, returning None if it does not exist."""
+    try:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+def _format_timestamp(timestamp):
+    """Format a file timestamp as local 'YYYY-MM-DD HH:MM:SS'."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+def _read_point_ids(ids_file):
+    """Read the point IDs saved alongside a project's points file.
+    
+    Args:
+        ids_file (str): Path to the newline-delimited IDs file
+        
+    Returns:
+        set: Point IDs as strings, or None if the file does not exist
+    """
+    try:
+        with open(ids_file, 'r') as f:
+            return {line for line in f.read().split('\n') if line}
+    except FileNotFoundError:
+        return None
+
+def _write_point_ids(ids_file, point_ids):
+    """Atomically replace the IDs file saved alongside a project's points file.
+    
+    Args:
+        ids_file (str): Path to the newline-delimited IDs file
+        point_ids (set): Point IDs as strings
+    """
+    write_file_atomic(ids_file, '\n'.join(sorted(point_ids)).encode('utf-8'))
+
+def _write_points_geojson(points_file, geojson):
+    """Atomically replace a project's points GeoJSON file.
+    
+    Concurrent readers see either the old or the new points, never a partial file.
+    
+    Args:
+        points_file (str): Path to the points GeoJSON file
+        geojson (dict): FeatureCollection to write
+    """
+    write_file_atomic(points_file, orjson.dumps(geojson))
+
+def _coerce_object_dtype(variable):
+    """Convert an object dtype data variable to strings, leaving others as they are."""
+    if variable.dtype == 'O':
+        return variable.astype(str)
+    return variable
+
+# Lock guarding the points index cache, since Flask may serve concurrent requests
+_points_index_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=8)
+def _load_points_index_cached(file_path, mtime):
+    """Parse a GeoJSON points file and index its feature bounds, cached per (path, mtime).
+    
+    Returns:
+        tuple: (features, bounds) where bounds is an (n, 4) float array of
+            minx, miny, maxx, maxy per feature, NaN for features without coordinates
+    """
+    with open(file_path, 'rb') as f:
+        features = orjson.loads(f.read()).get('features', [])
+    bounds = np.full((len(features), 4), np.nan)
+    for i, feature in enumerate(features):
+        feature_bounds = geometry_bounds(feature.get('geometry') or {})
+        if feature_bounds is not None:
+            bounds[i] = feature_bounds
+    return features, bounds
+
+def _features_in_bbox(file_path, bbox):
+    """Get the features of a GeoJSON file whose bounds intersect a bounding box.
+    
+    Args:
+        file_path (str): Path to the GeoJSON file
+        bbox (tuple): (minx, miny, maxx, maxy) to filter by
+        
+    Returns:
+        list: Intersecting GeoJSON features, in file order
+    """
+    mtime = os.path.getmtime(file_path)
+    with _points_index_lock:
+        features, bounds = _load_points_index_cached(file_path, mtime)
+    minx, miny, maxx, maxy = bbox
+    mask = (
+        (bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx)
+        & (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny)
+    )
+    return [features[i] for i in np.flatnonzero(mask)]
+
+# Serialized list_extracted_data responses per extracted_data directory, with
+# the directory signature they were built from
+_extraction_listing_cache = {}
+_extraction_listing_lock = threading.Lock()
+
+def _listing_signature(entries):
+    """Summarize the netCDF and metadata files of a directory listing.
+    
+    Any added, removed or rewritten extraction or metadata file changes the
+    signature, so it can key a cache of the assembled listing.
+    
+    Args:
+        entries (list): os.DirEntry objects from scanning the directory
+        
+    Returns:
+        tuple: Sorted (name, mtime_ns, size) tuples
+    """
+    signature = []
+    for entry in entries:
+        if entry.name.endswith('.nc') or entry.name.endswith('_metadata.json'):
+            entry_stat = entry.stat()
+            signature.append((entry.name, entry_stat.st_mtime_ns, entry_stat.st_size))
+    return tuple(sorted(signature))
+
+# Threads used to PNG-encode patch visualizations
+PNG_ENCODE_WORKERS = min(8, os.cpu_count() or 1)
+
+def _encode_png(image):
+    """Encode a uint8 RGB image as a base64 PNG string.
+    
+    Chips are small, so fast compression costs little in size.
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(image), 'RGB').save(buffer, format='PNG', compress_level=1)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+def _encode_jpeg(image):
+    """Encode a uint8 RGB image as a base64 JPEG string.
+    
+    Lossy, but faster to encode and smaller than PNG for map previews.
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(image), 'RGB').save(buffer, format='JPEG', quality=85)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+# Encoder and MIME type for each image format get_patch_visualization can return
+IMAGE_ENCODERS = {
+    'png': (_encode_png, 'image/png'),
+    'jpeg': (_encode_jpeg, 'image/jpeg'),
+}
+
+# Number of patches rendered and encoded together in get_patch_visualization
+PATCH_RENDER_BATCH = 64
+
+# Lock guarding the dataset cache, since Flask may serve concurrent requests. It
+# is only held for lookups and inserts, never while a file is read.
+_dataset_cache_lock = threading.Lock()
+
+# Number of in-memory datasets kept cached
+DATASET_CACHE_SIZE = 8
+
+# In-memory datasets keyed by (path, mtime, visualization type), least recently used first
+_dataset_cache = collections.OrderedDict()
+
+# Locks held while one cache key's dataset is read, so reads of different files
+# run in parallel while a duplicate request waits for the first
+_dataset_key_locks = {}
+
+# Bands each visualization reads, by collection and visualization type
+VISUALIZATION_BANDS = {
+    ('S2', 'true_color'): ('B4', 'B3', 'B2'),
+    ('S2', 'false_color'): ('B8', 'B8A', 'B4', 'B3'),
+    ('S2', 'ndvi'): ('B8', 'B8A', 'B4'),
+}
+
+# Bands read for every Sentinel-1 visualization
+S1_VISUALIZATION_BANDS = ('VV', 'VH')
+
+# Data variables get_patch_visualization reads; per-point dates and thresholds are skipped
+VISUALIZATION_VARIABLES = ('chips', 'longitude', 'latitude', 'label', 'point_id')
+
+def _read_dataset(file_path, visualization_type):
+    """Read the parts of an extracted dataset a visualization uses into memory.
+    
+    Only the variables and bands the visualization uses are read. The
+    dataset is read into memory and the file closed, so no handle is held open
+    while extraction rewrites the file; the new modification time then gives it
+    a fresh cache entry.
+    """
+    logger.info(f"Loading dataset from {file_path} for {visualization_type}")
+    with xr.open_dataset(file_path) as ds:
+        collection = ds.attrs.get('collection', 'S2')
+        if collection == 'S1':
+            needed_bands = S1_VISUALIZATION_BANDS
+        else:
+            needed_bands = VISUALIZATION_BANDS.get((collection, visualization_type), ())
+        band_positions = [i for i, band in enumerate(ds.band.values.tolist()) if band in needed_bands]
+        variables = [name for name in VISUALIZATION_VARIABLES if name in ds]
+        return ds[variables].isel(band=band_positions).load()
+
+def load_dataset(file_path, visualization_type):
+    """Get the bands of an extracted dataset a visualization needs, reusing a
+    cached copy when the file is unchanged.
+    
+    Args:
+        file_path (str): Path to the netCDF file
+        visualization_type (str): Visualization the data is loaded for
+        
+    Returns:
+        xr.Dataset: In-memory dataset, shared between callers, so it must not be modified
+    """
+    key = (file_path, os.path.getmtime(file_path), visualization_type)
+    with _dataset_cache_lock:
+        if key in _dataset_cache:
+            _dataset_cache.move_to_end(key)
+            return _dataset_cache[key]
+        key_lock = _dataset_key_locks.setdefault(key, threading.Lock())
+    
+    with key_lock:
+        # Another request may have read the dataset while this one waited
+        with _dataset_cache_lock:
+            if key in _dataset_cache:
+                _dataset_cache.move_to_end(key)
+                return _dataset_cache[key]
+        try:
+            ds = _read_dataset(file_path, visualization_type)
+            with _dataset_cache_lock:
+                _dataset_cache[key] = ds
+                while len(_dataset_cache) > DATASET_CACHE_SIZE:
+                    _dataset_cache.popitem(last=False)
+        finally:
+            with _dataset_cache_lock:
+                _dataset_key_locks.pop(key, None)
+    return ds
 
 def register_extraction_endpoints(app, socketio):
     """Register all extraction-related endpoints"""
@@ -68,57 +387,55 @@ def register_extraction_endpoints(app, socketio):
                 if 'properties' in feature and 'id' in feature['properties']:
                     new_ids.add(str(feature['properties']['id']))
             
-            # Check if we need to clean up extracted data
-            if os.path.exists(master_points_file):
+            # Check if we need to clean up extracted data. The IDs saved with the
+            # previous export are read from the small sidecar file when present,
+            # instead of parsing the whole points file
+            points_ids_file = os.path.join(project_dir, "points.ids")
+            old_ids = _read_point_ids(points_ids_file)
+            if old_ids is not None or os.path.exists(master_points_file):
                 try:
-                    # Read the old GeoJSON file directly
-                    with open(master_points_file, 'r') as f:
-                        old_geojson = json.load(f)
-                    
-                    old_features = old_geojson.get('features', [])
-                    logger.info(f"Old features: {len(old_features)}, New features: {len(features)}")
+                    if old_ids is None:
+                        # Read the old GeoJSON file directly
+                        with open(master_points_file, 'rb') as f:
+                            old_geojson = orjson.loads(f.read())
+                        
+                        # Extract old point IDs
+                        old_ids = set()
+                        for feature in old_geojson.get('features', []):
+                            if 'properties' in feature and 'id' in feature['properties']:
+                                old_ids.add(str(feature['properties']['id']))
                     
-                    # Extract old point IDs
-                    old_ids = set()
-                    for feature in old_features:
-                        if 'properties' in feature and 'id' in feature['properties']:
-                            old_ids.add(str(feature['properties']['id']))
+                    logger.info(f"Old point IDs: {len(old_ids)}, New point IDs: {len(new_ids)}")
                     
                     # Find removed points
-                    if len(old_features) > len(features):
-                        removed_ids = old_ids - new_ids
-                        
-                        if removed_ids:
-                            logger.info(f"Found {len(removed_ids)} removed points: {removed_ids}")
-                            # Clean up extracted data for removed points
-                            cleanup_extracted_data(project_id, removed_ids)
-                        else:
-                            logger.info("No points were removed (IDs don't match)")
+                    removed_ids = old_ids - new_ids
+                    if removed_ids:
+                        logger.info(f"Found {len(removed_ids)} removed points: {removed_ids}")
+                        # Clean up extracted data for removed points
+                        cleanup_extracted_data(project_id, removed_ids)
                     else:
-                        logger.info("No points were removed (count check)")
+                        logger.info("No points were removed")
                 except Exception as e:
                     logger.error(f"Error checking for removed points: {str(e)}")
                     logger.error(f"Traceback: {traceback.format_exc()}")
             
-            # Convert to GeoDataFrame 
-            import geopandas as gpd
-            new_features = geojson['features']
-            new_gdf = gpd.GeoDataFrame.from_features(new_features)
-            
-            # Ensure we have the right CRS (WGS84)
-            new_gdf.crs = "EPSG:4326"
-            
-            # Save the new points directly (replacing any existing file)
-            new_gdf.to_file(master_points_file, driver="GeoJSON")
-            gdf = new_gdf
+            # Save the new points, replacing any existing file. The features are
+            # already GeoJSON in WGS84, so they are written as-is with orjson
+            # instead of round-tripping through a GeoDataFrame and the OGR driver
+            _write_points_geojson(master_points_file, {
+                "type": "FeatureCollection",
+                "features": features
+            })
+            _write_point_ids(points_ids_file, new_ids)
             
+            point_classes = [(feature.get('properties') or {}).get('class') for feature in features]
             point_counts = {
-                'positive': len(gdf[gdf['class'] == 'positive']),
-                'negative': len(gdf[gdf['class'] == 'negative']),
-                'total': len(gdf)
+                'positive': point_classes.count('positive'),
+                'negative': point_classes.count('negative'),
+                'total': len(features)
             }
             
-            logger.info(f"Updated master points file with {len(new_gdf)} points, total: {point_counts['total']}")
+            logger.info(f"Updated master points file with {len(features)} points, total: {point_counts['total']}")
             logger.info(f"  - Positive: {point_counts['positive']}")
             logger.info(f"  - Negative: {point_counts['negative']}")
             
@@ -141,10 +458,20 @@ def register_extraction_endpoints(app, socketio):
             # Get the project id and optional filename from the query parameters
             project_id = request.args.get('project_id', '')
             filename = request.args.get('filename', 'points.geojson')  # Default to master points file
+            bbox_param = request.args.get('bbox', '')  # Optional minx,miny,maxx,maxy filter
             
             if not project_id:
                 return jsonify({"success": False, "message": "Project ID is required"}), 400
             
+            bbox = None
+            if bbox_param:
+                try:
+                    bbox = tuple(float(value) for value in bbox_param.split(','))
+                except ValueError:
+                    bbox = ()
+                if len(bbox) != 4:
+                    return jsonify({"success": False, "message": "bbox must be minx,miny,maxx,maxy"}), 400
+            
             # Check if project exists
             project_dir = os.path.join(PROJECTS_DIR, project_id)
             if not os.path.exists(project_dir) or not os.path.isdir(project_dir):
@@ -165,18 +492,30 @@ def register_extraction_endpoints(app, socketio):
                 else:
                     return jsonify({"success": False, "message": f"File '{filename}' not found in project '{project_id}'"}), 404
             
-            # Read the GeoJSON file
-            import geopandas as gpd
-            gdf = gpd.read_file(filepath)
+            if filename.endswith('.geojson'):
+                # Only the features intersecting the bbox, found from the cached
+                # bounds index
+                if bbox is not None:
+                    return json_response({
+                        "success": True,
+                        "geojson": {
+                            "type": "FeatureCollection",
+                            "features": _features_in_bbox(filepath, bbox)
+                        }
+                    })
+                
+                # GeoJSON files are forwarded as raw bytes rather than being parsed
+                # into a GeoDataFrame and re-serialized
+                with open(filepath, 'rb') as f:
+                    geojson_bytes = f.read()
+                return json_response(b'{"success":true,"geojson":' + geojson_bytes + b'}')
             
-            # Convert to GeoJSON
-            geojson = json.loads(gdf.to_json())
+            # Read other vector formats through geopandas, letting the driver
+            # apply the bbox filter
+            gdf = gpd.read_file(filepath, bbox=bbox)
             
             # Return the GeoJSON data
-            return jsonify({
-                "success": True,
-                "geojson": geojson
-            })
+            return json_response(b'{"success":true,"geojson":' + gdf.to_json().encode('utf-8') + b'}')
             
         except Exception as e:
             return jsonify({"success": False, "message": str(e)}), 500
@@ -238,8 +577,7 @@ def register_extraction_endpoints(app, socketio):
                 feature['properties']['clear_threshold'] = point_clear_threshold
             
             # Save the updated points GeoJSON back to disk
-            with open(points_geojson_file, 'w') as f:
-                json.dump(points_geojson, f, indent=2)
+            _write_points_geojson(points_geojson_file, points_geojson)
             
             # Check if all points have already been extracted
             all_points_extracted = False
@@ -287,9 +625,21 @@ def register_extraction_endpoints(app, socketio):
             # If we got here, we still need to extract some points
             # Extract data only if needed
             if not all_points_extracted:
-                # Create a progress callback function
+                # Create a progress callback function that throttles updates: emit at most every
+                # 100ms or whenever the whole-percent progress changes, and always emit
+                # the final point
+                progress_state = {'last_time': 0.0, 'last_percent': -1}
+                
                 def progress_callback(current, total):
                     progress = (current / total) * 100
+                    now = time.monotonic()
+                    if (current < total
+                            and now - progress_state['last_time'] < 0.1
+                            and int(progress) == progress_state['last_percent']):
+                        return
+                    progress_state['last_time'] = now
+                    progress_state['last_percent'] = int(progress)
+                    
                     socketio.emit('extraction_progress', {
                         'project_id': project_id,
                         'progress': progress,
@@ -377,45 +727,58 @@ def register_extraction_endpoints(app, socketio):
             if not os.path.exists(project_dir) or not os.path.isdir(project_dir):
                 return jsonify({"success": False, "message": f"Project '{project_id}' not found"}), 404
             
-            # Check if extracted_data directory exists
+            # Scan the extracted_data directory; each entry caches its own stat result
             extracted_dir = os.path.join(project_dir, "extracted_data")
-            if not os.path.exists(extracted_dir):
+            try:
+                with os.scandir(extracted_dir) as it:
+                    entries = list(it)
+            except FileNotFoundError:
                 logger.info(f"No extracted_data directory found at {extracted_dir}")
                 return jsonify({"success": True, "extractions": []})
-            
-            # Get all netCDF files
-            nc_files = [f for f in os.listdir(extracted_dir) if f.endswith('.nc')]
-            logger.info(f"Found {len(nc_files)} netCDF files in {extracted_dir}:")
-            for file in nc_files:
-                logger.info(f"  - {file}")
-            
-            if len(nc_files) == 0:
+            nc_entries = [entry for entry in entries if entry.name.endswith('.nc')]
+            
+            # Reuse the last response for this directory if none of its extraction
+            # or metadata files changed, skipping the metadata reads
+            signature = _listing_signature(entries)
+            with _extraction_listing_lock:
+                cached = _extraction_listing_cache.get(extracted_dir)
+            if cached is not None and cached[0] == signature:
+                return json_response(cached[1])
+            
+            def listing_response(extractions):
+                body = orjson.dumps({"success": True, "extractions": extractions})
+                with _extraction_listing_lock:
+                    _extraction_listing_cache[extracted_dir] = (signature, body)
+                return json_response(body)
+            
+            logger.info(f"Found {len(nc_entries)} netCDF files in {extracted_dir}:")
+            for entry in nc_entries:
+                logger.info(f"  - {entry.name}")
+            
+            if len(nc_entries) == 0:
                 return jsonify({"success": True, "extractions": []})
             
             # Look for project data files
             extractions = []
             
             # Look for any file with "extracted_data.nc" in the name - these are project data files
-            project_data_files = [f for f in nc_files if "extracted_data.nc" in f]
-            logger.info(f"Found {len(project_data_files)} project data files: {project_data_files}")
+            project_data_entries = [entry for entry in nc_entries if "extracted_data.nc" in entry.name]
+            logger.info(f"Found {len(project_data_entries)} project data files: {[entry.name for entry in project_data_entries]}")
             
-            if project_data_files:
+            if project_data_entries:
                 # Process project data files first
-                for nc_file in project_data_files:
+                for entry in project_data_entries:
+                    nc_file = entry.name
+                    file_stat = entry.stat()
+                    
                     # Find corresponding metadata file
                     base_name = nc_file.rsplit('.', 1)[0]
-                    metadata_file = f"{base_name}_metadata.json"
-                    metadata_path = os.path.join(extracted_dir, metadata_file)
+                    metadata_path = os.path.join(extracted_dir, f"{base_name}_metadata.json")
                     
                     logger.info(f"Looking for metadata file: {metadata_path}")
                     
-                    file_path = os.path.join(extracted_dir, nc_file)
-                    file_size = os.path.getsize(file_path) / (1024 * 1024)  # Convert to MB
-                    
-                    if os.path.exists(metadata_path):
-                        with open(metadata_path, 'r') as f:
-                            metadata = json.load(f)
-                        
+                    metadata = _read_json_file(metadata_path)
+                    if metadata is not None:
                         # For project data files, use the last_updated field
                         last_updated = metadata.get('last_updated', '')
                         collection = metadata.get('collection', '')
@@ -424,7 +787,7 @@ def register_extraction_endpoints(app, socketio):
                         num_chips = metadata.get('num_chips', 0)
                     else:
                         # Create default metadata if file exists but metadata doesn't
-                        last_updated = datetime.datetime.fromtimestamp(os.path.getmtime(file_path)).strftime('%Y-%m-%d %H:%M:%S')
+                        last_updated = _format_timestamp(file_stat.st_mtime)
                         # Try to extract collection from filename (e.g., S2_64px_extracted_data.nc -> S2)
                         collection = nc_file.split('_')[0] if '_' in nc_file else ''
                         start_date = ''
@@ -433,14 +796,14 @@ def register_extraction_endpoints(app, socketio):
                     
                     extraction_data = {
                         'filename': nc_file,
-                        'created': datetime.datetime.fromtimestamp(os.path.getctime(file_path)).strftime('%Y-%m-%d %H:%M:%S'),
+                        'created': _format_timestamp(file_stat.st_ctime),
                         'last_updated': last_updated,
                         'collection': collection,
                         'start_date': start_date,
                         'end_date': end_date,
                         'num_chips': num_chips,
                         'is_project_data': True,
-                        'file_size_mb': round(file_size, 2)
+                        'file_size_mb': round(file_stat.st_size / (1024 * 1024), 2)
                     }
                     extractions.append(extraction_data)
                     logger.info(f"Added project data file to extractions: {nc_file}")
@@ -450,38 +813,32 @@ def register_extraction_endpoints(app, socketio):
                     # Sort by creation time, most recent first
                     extractions.sort(key=lambda x: x.get('last_updated', x.get('created', '')), reverse=True)
                     
-                    return jsonify({
-                        "success": True, 
-                        "extractions": extractions
-                    })
+                    return listing_response(extractions)
             
             # If no project data files found, process legacy files
-            legacy_files = [f for f in nc_files if "extracted_data.nc" not in f]
-            logger.info(f"Processing {len(legacy_files)} legacy files")
+            legacy_entries = [entry for entry in nc_entries if "extracted_data.nc" not in entry.name]
+            logger.info(f"Processing {len(legacy_entries)} legacy files")
             
-            for nc_file in legacy_files:
+            for entry in legacy_entries:
+                nc_file = entry.name
+                
                 # Find corresponding metadata file
                 base_name = nc_file.rsplit('.', 1)[0]
-                metadata_file = f"{base_name}_metadata.json"
-                metadata_path = os.path.join(extracted_dir, metadata_file)
+                metadata = _read_json_file(os.path.join(extracted_dir, f"{base_name}_metadata.json"))
                 
-                if os.path.exists(metadata_path):
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                        
-                    file_path = os.path.join(extracted_dir, nc_file)
-                    file_size = os.path.getsize(file_path) / (1024 * 1024)  # Convert to MB
+                if metadata is not None:
+                    file_stat = entry.stat()
                     
                     extraction_data = {
                         'filename': nc_file,
-                        'created': datetime.datetime.fromtimestamp(os.path.getctime(file_path)).strftime('%Y-%m-%d %H:%M:%S'),
+                        'created': _format_timestamp(file_stat.st_ctime),
                         'extraction_time': metadata.get('extraction_time', ''),
                         'collection': metadata.get('collection', ''),
                         'start_date': metadata.get('start_date', ''),
                         'end_date': metadata.get('end_date', ''),
                         'num_chips': metadata.get('num_chips', 0),
                         'is_project_data': False,
-                        'file_size_mb': round(file_size, 2)
+                        'file_size_mb': round(file_stat.st_size / (1024 * 1024), 2)
                     }
                     extractions.append(extraction_data)
             
@@ -492,10 +849,7 @@ def register_extraction_endpoints(app, socketio):
             # Sort by creation time, most recent first
             extractions.sort(key=lambda x: x.get('last_updated', x.get('extraction_time', x.get('created', ''))), reverse=True)
             
-            return jsonify({
-                "success": True, 
-                "extractions": extractions
-            })
+            return listing_response(extractions)
             
         except Exception as e:
             logger.error(f"Error in list_extracted_data: {str(e)}")
@@ -510,12 +864,19 @@ def register_extraction_endpoints(app, socketio):
             visualization_type = request.args.get('vis_type', 'true_color')
             check_only = request.args.get('check_only', 'false').lower() == 'true'
             point_id = request.args.get('point_id', '')
+            limit = request.args.get('limit', type=int)
+            offset = max(request.args.get('offset', 0, type=int), 0)
+            image_format = request.args.get('format', 'png').lower()
             
             logger.info(f"get_patch_visualization called: project={project_id}, file={extraction_file}, type={visualization_type}, check_only={check_only}, point_id={point_id}")
             
             if not project_id:
                 return jsonify({"success": False, "message": "Project ID is required"}), 400
             
+            if image_format not in IMAGE_ENCODERS:
+                return jsonify({"success": False, "message": f"Unsupported image format '{image_format}'"}), 400
+            encode_image, image_mime = IMAGE_ENCODERS[image_format]
+            
             # Check if project exists
             project_dir = os.path.join(PROJECTS_DIR, project_id)
             if not os.path.exists(project_dir) or not os.path.isdir(project_dir):
@@ -561,8 +922,8 @@ def register_extraction_endpoints(app, socketio):
                     "project_id": project_id
                 })
             
-            # Open the dataset
-            ds = xr.open_dataset(file_path)
+            # Load the dataset (cached across requests until the file changes)
+            ds = load_dataset(file_path, visualization_type)
             
             # Get the visualization data
             collection = ds.attrs.get('collection', 'S2')
@@ -578,158 +939,50 @@ def register_extraction_endpoints(app, socketio):
             bands = ds.band.values.tolist()
             point_ids = ds.point_id.values.tolist() if 'point_id' in ds else [str(i) for i in range(len(longitudes))]
             
-            # Create visualization data for each patch
-            for i in range(len(longitudes)):
-                # Get the current chip and its coordinates
-                chip = chips[i]
-                lon = float(longitudes[i])  # Convert to Python float
-                lat = float(latitudes[i])   # Convert to Python float
-                label = str(labels[i])      # Convert to Python string
-                current_point_id = str(point_ids[i])  # Convert to Python string
-                
-                # If point_id is specified, only process that specific point
-                if point_id and current_point_id != point_id:
-                    continue
-                
-                # Create visualization based on the collection and requested type
-                img_data = None
+            # Only process the requested point if point_id is specified, otherwise
+            # the requested page of patches
+            if point_id:
+                selected = [i for i, pid in enumerate(point_ids) if str(pid) == point_id]
+            else:
+                end = len(longitudes) if limit is None else offset + max(limit, 0)
+                selected = list(range(len(longitudes)))[offset:end]
+            chip_size = int(ds.attrs.get('chip_size', 64))
+            
+            # Render the patches a block at a time so the float32 working copies
+            # stay bounded by the block rather than the dataset. Each block's image
+            # encodes are queued without waiting, so they overlap rendering of the
+            # next block; Pillow releases the GIL while compressing
+            pending = []
+            with concurrent.futures.ThreadPoolExecutor(max_workers=PNG_ENCODE_WORKERS) as executor:
+                for start in range(0, len(selected), PATCH_RENDER_BATCH):
+                    block = selected[start:start + PATCH_RENDER_BATCH]
+                    images = _render_patches(chips[block], bands, collection, visualization_type)
+                    if images is None:
+                        break
+                    pending.extend(zip(block, (executor.submit(encode_image, image) for image in images)))
                 
-                if collection == 'S2':
-                    if visualization_type == 'true_color':
-                        # True color: RGB (B4, B3, B2)
-                        red_idx = bands.index('B4') if 'B4' in bands else None
-                        green_idx = bands.index('B3') if 'B3' in bands else None
-                        blue_idx = bands.index('B2') if 'B2' in bands else None
-                        
-                        if red_idx is not None and green_idx is not None and blue_idx is not None:
-                            rgb = np.stack(
-                                [
-                                    np.clip(chip[:, :, red_idx] / 3000, 0, 1),
-                                    np.clip(chip[:, :, green_idx] / 3000, 0, 1),
-                                    np.clip(chip[:, :, blue_idx] / 3000, 0, 1)
-                                ], 
-                                axis=-1
-                            )
-                            img_data = rgb
-                    
-                    elif visualization_type == 'false_color':
-                        # False color: NIR, Red, Green (B8, B4, B3)
-                        nir_idx = bands.index('B8') if 'B8' in bands else bands.index('B8A') if 'B8A' in bands else None
-                        red_idx = bands.index('B4') if 'B4' in bands else None
-                        green_idx = bands.index('B3') if 'B3' in bands else None
-                        
-                        if nir_idx is not None and red_idx is not None and green_idx is not None:
-                            rgb = np.stack(
-                                [
-                                    np.clip(chip[:, :, nir_idx] / 5000, 0, 1),
-                                    np.clip(chip[:, :, red_idx] / 3000, 0, 1),
-                                    np.clip(chip[:, :, green_idx] / 3000, 0, 1)
-                                ], 
-                                axis=-1
-                            )
-                            img_data = rgb
-                    
-                    elif visualization_type == 'ndvi':
-                        # NDVI visualization
-                        nir_idx = bands.index('B8') if 'B8' in bands else bands.index('B8A') if 'B8A' in bands else None
-                        red_idx = bands.index('B4') if 'B4' in bands else None
-                        
-                        if nir_idx is not None and red_idx is not None:
-                            nir = chip[:, :, nir_idx].astype(float)
-                            red = chip[:, :, red_idx].astype(float)
-                            
-                            # Avoid division by zero
-                            denominator = nir + red
-                            ndvi = np.zeros_like(nir)
-                            valid_idx = denominator > 0
-                            ndvi[valid_idx] = (nir[valid_idx] - red[valid_idx]) / denominator[valid_idx]
-                            
-                            # Apply colormap directly without using matplotlib figure
-                            # Define the NDVI colormap (similar to RdYlGn)
-                            # Colors from red (-1) to green (1)
-                            colors_rgba = np.array([
-                                [0.84, 0.19, 0.15, 1.0],  # dark red
-                                [0.99, 0.55, 0.35, 1.0],  # light red
-                                [0.99, 0.88, 0.55, 1.0],  # yellow
-                                [0.85, 0.94, 0.55, 1.0],  # light green
-                                [0.57, 0.81, 0.38, 1.0],  # medium green
-                                [0.10, 0.60, 0.31, 1.0]   # dark green
-                            ])
-                            
-                            # clip NDVI values from [0, 1] as negative ndvi values are atypical
-                            ndvi_norm = np.clip(ndvi, 0, 1)
-                            
-                            # Create RGB image by mapping NDVI values to colors
-                            # Scale the normalized values to the colormap indices
-                            idx = np.clip((ndvi_norm * (len(colors_rgba) - 1)), 0, len(colors_rgba) - 1.001)
-                            
-                            # Get the indices for interpolation
-                            idx_low = np.floor(idx).astype(int)
-                            idx_high = np.ceil(idx).astype(int)
-                            frac = idx - idx_low
-                            
-                            # Create empty RGB image
-                            h, w = ndvi.shape
-                            rgb = np.zeros((h, w, 3))
-                            
-                            # Apply linear interpolation between colors
-                            for i in range(3):  # RGB channels
-                                low_val = colors_rgba[idx_low, i]
-                                high_val = colors_rgba[idx_high, i]
-                                
-                                # Reshape frac for broadcasting
-                                frac_reshaped = frac.reshape(h, w)
-                                
-                                # Interpolate
-                                rgb[:, :, i] = low_val * (1 - frac_reshaped) + high_val * frac_reshaped
-                            
-                            img_data = rgb
-                
-                elif collection == 'S1':
-                    # For Sentinel-1, create a simple visualization using VV and VH bands
-                    vv_idx = bands.index('VV') if 'VV' in bands else None
-                    vh_idx = bands.index('VH') if 'VH' in bands else None
-                    
-                    if vv_idx is not None and vh_idx is not None:
-                        # Simple RGB composite using VV for red and green, VH for blue
-                        vv = np.clip(chip[:, :, vv_idx] / 0.3, 0, 1)  # Typical range for VV
-                        vh = np.clip(chip[:, :, vh_idx] / 0.1, 0, 1)  # Typical range for VH
-                        
-                        rgb = np.stack([vv, vv, vh], axis=-1)
-                        img_data = rgb
-                
-                # If we have image data, encode it as base64
-                if img_data is not None:
-                    # Convert to 8-bit image
-                    img_8bit = (img_data * 255).astype(np.uint8)
-                    img = Image.fromarray(img_8bit)
-                    
-                    # Save to buffer and encode as base64
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='PNG')
-                    img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                    
+                for i, future in pending:
                     # Create patch info with all native Python types
                     patch_info = {
-                        'longitude': float(lon),
-                        'latitude': float(lat),
-                        'label': str(label),
-                        'image': img_str,
-                        'chip_size': int(ds.attrs.get('chip_size', 64))
+                        'longitude': float(longitudes[i]),
+                        'latitude': float(latitudes[i]),
+                        'label': str(labels[i]),
+                        'image': future.result(),
+                        'image_mime': image_mime,
+                        'chip_size': chip_size
                     }
                     
                     patch_data.append(patch_info)
             
-            # Close the dataset
-            ds.close()
-            
-            # Use the custom JSON encoder to handle NumPy types
-            return json.dumps({
+            # orjson serializes any remaining NumPy types natively
+            return json_response({
                 "success": True,
                 "collection": collection,
                 "visualization_type": visualization_type,
+                "total_patches": len(longitudes),
+                "offset": offset,
                 "patches": patch_data
-            }, cls=NumpyEncoder), 200, {'Content-Type': 'application/json'}
+            })
             
         except Exception as e:
             logger.error(f"Error processing patch visualization: {str(e)}")
@@ -876,8 +1129,6 @@ def register_extraction_endpoints(app, socketio):
             
             # Create a Point GeoDataFrame with just this point
             from shapely.geometry import Point
-            import geopandas as gpd
-            import pandas as pd
             
             point_geometry = Point(point_coords[0], point_coords[1])
             point_gdf = gpd.GeoDataFrame(
@@ -1024,39 +1275,33 @@ def register_extraction_endpoints(app, socketio):
                         # Check if the dataset has point IDs
                         if 'point_id' in ds:
                             # Get point IDs as strings
-                            point_ids = [str(pid) for pid in ds.point_id.values]
+                            point_ids = ds.point_id.values.astype(str)
                             
-                            # Find indices of points to keep
-                            keep_indices = [i for i, pid in enumerate(point_ids) if pid not in removed_point_ids]
-                            removed_indices = [i for i, pid in enumerate(point_ids) if pid in removed_point_ids]
+                            # Find indices of points to keep with one vectorized membership test
+                            removed_mask = np.isin(point_ids, np.array(sorted(removed_point_ids), dtype=str))
+                            keep_indices = np.flatnonzero(~removed_mask)
+                            removed_indices = np.flatnonzero(removed_mask)
                             
                             logger.info(f"Points to keep: {len(keep_indices)}, Points to remove: {len(removed_indices)}")
-                            if removed_indices:
-                                logger.info(f"Removing point indices: {removed_indices}")
-                                logger.info(f"Removing point IDs: {[point_ids[i] for i in removed_indices]}")
+                            if len(removed_indices):
+                                logger.info(f"Removing point indices: {removed_indices.tolist()}")
+                                logger.info(f"Removing point IDs: {point_ids[removed_indices].tolist()}")
                             
                             if len(keep_indices) < len(point_ids):
                                 # Create a new dataset without the removed points
                                 logger.info(f"Creating new dataset with {len(keep_indices)} points")
                                 new_ds = ds.isel(point=keep_indices)
                                 
-                                # Ensure label has a consistent data type
-                                if 'label' in new_ds:
-                                    # Convert label to string if it's an object type
-                                    if new_ds.label.dtype == 'O':
-                                        logger.info(f"Converting label from {new_ds.label.dtype} to string type")
-                                        new_ds['label'] = new_ds.label.astype(str)
-                                
-                                # Check for other object dtypes that might cause issues
-                                for var_name, var in new_ds.variables.items():
-                                    if var.dtype == 'O':
-                                        logger.info(f"Warning: Variable '{var_name}' has object dtype which may cause serialization issues")
-                                        try:
-                                            # Try to convert to string
-                                            new_ds[var_name] = var.astype(str)
-                                            logger.info(f"Converted '{var_name}' to string type")
-                                        except Exception as e:
-                                            logger.info(f"Could not convert '{var_name}' to string: {e}")
+                                # Convert object dtype variables, such as labels and
+                                # point IDs, to strings so they serialize consistently
+                                new_ds = new_ds.map(_coerce_object_dtype, keep_attrs=True)
+                                object_coords = {
+                                    name: coord.astype(str)
+                                    for name, coord in new_ds.coords.items()
+                                    if coord.dtype == 'O'
+                                }
+                                if object_coords:
+                                    new_ds = new_ds.assign_coords(object_coords)
                                 
                                 # Save to a temporary file
                                 temp_file = file_path + '.temp'
@@ -1,4 +1,5 @@
 from flask import request, jsonify
+from flask_socketio import join_room, leave_room, rooms
 import os
 import datetime
 import json
@@ -13,6 +14,21 @@ logger = logging.getLogger(__name__)
 def register_projects_endpoints(app, socketio):
     """Register all project-related endpoints"""
     
+    @socketio.on('join_project')
+    def join_project(data):
+        """Move the client into the room for the project it has open.
+        
+        Job events (e.g. deployment progress) are emitted to the project's
+        room, so clients only receive updates for the project they are viewing.
+        """
+        project_id = (data or {}).get('project_id')
+        for room in rooms():
+            if room != request.sid:
+                leave_room(room)
+        if project_id:
+            join_room(project_id)
+            logger.debug(f"Client {request.sid} joined project room {project_id}")
+    
     @app.route('/list_projects', methods=['GET'])
     def list_projects():
         try:
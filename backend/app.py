@@ -3,6 +3,7 @@ from flask_cors import CORS
 from flask_socketio import SocketIO
 import logging
 import os
+import tensorflow as tf
 
 # Import API endpoint registration functions
 from api.projects import register_projects_endpoints
@@ -49,6 +50,14 @@ def initialize_app():
     """Initialize the application components."""
     logger.info("Initializing application...")
     
+    # Let TensorFlow grow GPU memory on demand instead of reserving all of it up
+    # front, so training and deployments can share the device in one process
+    for gpu in tf.config.list_physical_devices('GPU'):
+        try:
+            tf.config.experimental.set_memory_growth(gpu, True)
+        except RuntimeError as e:
+            logger.warning(f"Could not enable memory growth for {gpu.name}: {e}")
+    
     # Register API endpoints from each module
     logger.info("Registering API endpoints...")
     register_projects_endpoints(app, socketio)
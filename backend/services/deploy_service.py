@@ -4,19 +4,288 @@ This module handles deploying trained models on satellite imagery.
 """
 import ee
 import os
-import json
+import math
+import orjson
 import logging
 import numpy as np
 import geopandas as gpd
-from shapely.geometry import Polygon
+import tensorflow as tf
+from shapely.geometry import Polygon, shape
 import datetime
+import collections
 import concurrent.futures
+import itertools
+import functools
+import tempfile
+import threading
 import traceback
 
 from config import PROJECTS_DIR, PIXEL_SIZE, BAND_IDS, EE_PROJECT
+from utils.helpers import geometry_bounds, write_file_atomic
+
+# Approximate length of one degree of latitude (and of longitude at the equator)
+METERS_PER_DEGREE_LAT = 111320
+
+# Decimal places kept for prediction coordinates (~0.1 m, well below the pixel size)
+COORDINATE_PRECISION = 6
+
+# Number of chips passed through the model per call of its inference function
+INFERENCE_CHUNK_SIZE = 256
+
+@functools.lru_cache(maxsize=None)
+def initialize_earth_engine(ee_project=EE_PROJECT):
+    """Initialize Earth Engine against the high-volume endpoint.
+    
+    Initialization is cached per project, so only the first call in a process
+    pays for the authentication round-trip. Failed attempts are not cached.
+    
+    Args:
+        ee_project (str): Google Earth Engine project ID
+    """
+    ee.Initialize(
+        opt_url="https://earthengine-highvolume.googleapis.com",
+        project=ee_project,
+    )
+
+def get_region_bounds_info(region):
+    """Get the bounding box of a region as a GeoJSON Polygon dict.
+    
+    Bounds of GeoJSON regions are reduced locally from the raw coordinate arrays
+    with NumPy and bounds dicts are used as given; only ee.Geometry regions need
+    a blocking getInfo()
+    round-trip to Earth Engine. The ring follows Earth Engine's vertex order,
+    starting at the south-west corner and ending at the same point.
+    
+    Args:
+        region: GeoJSON Polygon/MultiPolygon dict (optionally wrapped in a
+            Feature), a bounds dict with west/south/east/north keys, or an
+            ee.Geometry
+        
+    Returns:
+        dict: GeoJSON Polygon with the region's bounding box
+    """
+    if isinstance(region, dict):
+        if all(key in region for key in ('west', 'south', 'east', 'north')):
+            minx, miny, maxx, maxy = region['west'], region['south'], region['east'], region['north']
+        else:
+            bounds = geometry_bounds(region)
+            if bounds is None:
+                raise ValueError('Region has no coordinates')
+            minx, miny, maxx, maxy = bounds
+        return {
+            'type': 'Polygon',
+            'coordinates': [[
+                [minx, miny],
+                [maxx, miny],
+                [maxx, maxy],
+                [minx, maxy],
+                [minx, miny]
+            ]]
+        }
+    return region.bounds().getInfo()
+
+def get_region_centroid(region):
+    """Get the centroid of a region as (lon, lat).
+    
+    GeoJSON regions and bounds dicts are handled locally; only ee.Geometry
+    regions need a getInfo() round-trip to Earth Engine.
+    
+    Args:
+        region: GeoJSON Polygon/MultiPolygon dict (optionally wrapped in a
+            Feature), a bounds dict with west/south/east/north keys, or an
+            ee.Geometry
+        
+    Returns:
+        tuple: (lon, lat) of the centroid
+    """
+    if isinstance(region, dict):
+        if all(key in region for key in ('west', 'south', 'east', 'north')):
+            return (region['west'] + region['east']) / 2, (region['south'] + region['north']) / 2
+        if region.get('type') == 'Feature':
+            region = region['geometry']
+        centroid = shape(region).centroid
+        return centroid.x, centroid.y
+    lon, lat = region.centroid().coordinates().getInfo()
+    return lon, lat
+
+# Number of traced inference functions kept, one per loaded Keras model
+INFERENCE_CACHE_SIZE = 8
+
+# Traced inference functions keyed by model identity, least recently used first.
+# Each entry keeps its model alive, so the id cannot be reused while cached.
+_inference_functions = collections.OrderedDict()
+_inference_functions_lock = threading.Lock()
+
+def _inference_function(model):
+    """Build a traced inference function for a model, once per model.
+    
+    The fixed input signature means every batch runs through the same graph,
+    avoiding the per-call setup and retracing overhead of model.predict().
+    
+    Args:
+        model: Keras model to run
+        
+    Returns:
+        tf.types.experimental.GenericFunction: Function mapping a float32 chip
+            batch to model outputs
+    """
+    with _inference_functions_lock:
+        entry = _inference_functions.get(id(model))
+        if entry is not None and entry[0] is model:
+            _inference_functions.move_to_end(id(model))
+            return entry[1]
+        input_spec = tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)
+        infer = tf.function(lambda batch: model(batch, training=False), input_signature=[input_spec])
+        _inference_functions[id(model)] = (model, infer)
+        while len(_inference_functions) > INFERENCE_CACHE_SIZE:
+            _inference_functions.popitem(last=False)
+        return infer
+
+def release_inference_function(model):
+    """Drop the traced inference function for one model, releasing the reference it holds."""
+    with _inference_functions_lock:
+        entry = _inference_functions.get(id(model))
+        if entry is not None and entry[0] is model:
+            del _inference_functions[id(model)]
+
+def _chip_chunks(chip_arrays, chunk_size):
+    """Yield float32 batches of at most chunk_size chips from a list of chip arrays.
+    
+    Batches are views where possible; only a batch spanning two arrays is copied,
+    so the chips are never joined into one large array.
+    """
+    parts, count = [], 0
+    for array in chip_arrays:
+        start = 0
+        while start < len(array):
+            take = min(chunk_size - count, len(array) - start)
+            parts.append(array[start:start + take])
+            count += take
+            start += take
+            if count == chunk_size:
+                yield (parts[0] if len(parts) == 1 else np.concatenate(parts)).astype(np.float32, copy=False)
+                parts, count = [], 0
+    if parts:
+        yield (parts[0] if len(parts) == 1 else np.concatenate(parts)).astype(np.float32, copy=False)
+
+class TFLiteModel:
+    """Inference-only wrapper around a TFLite model with a Keras-like interface.
+    
+    Exposes input_shape and is callable on a batch of chips, so it can stand in
+    for a Keras model in ModelDeployer. An interpreter is not thread-safe, so each
+    deployment builds its own wrapper and uses it from one thread at a time.
+    """
+    def __init__(self, tflite_path):
+        self.interpreter = tf.lite.Interpreter(model_path=tflite_path)
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(dim) for dim in self.input_details['shape'][1:])
+        self.batch_size = None
+    
+    def __call__(self, batch):
+        # Resize and reallocate the input only when the batch size changes
+        if self.batch_size != len(batch):
+            self.interpreter.resize_tensor_input(self.input_details['index'], (len(batch),) + self.input_shape[1:])
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(batch)
+        self.interpreter.set_tensor(self.input_details['index'], batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_details['index'])
+
+def convert_model_to_tflite(model, model_path, quantization='fp16'):
+    """Convert a Keras model to a quantized TFLite model saved beside it.
+    
+    The converted file is reused until the .h5 model is newer than it.
+    
+    Args:
+        model: Loaded Keras model
+        model_path (str): Path to the .h5 model file
+        quantization (str): 'fp16' for float16 weights, or 'int8' for
+            dynamic-range quantization (int8 weights, float activations)
+        
+    Returns:
+        str: Path to the .tflite file
+    """
+    tflite_path = model_path.replace('.h5', f'_{quantization}.tflite')
+    if os.path.exists(tflite_path) and os.path.getmtime(tflite_path) >= os.path.getmtime(model_path):
+        return tflite_path
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'fp16':
+        converter.target_spec.supported_types = [tf.float16]
+    tflite_bytes = converter.convert()
+    
+    # Write beside the target and swap it in, so a crash or a concurrent
+    # conversion never leaves a truncated file that looks up to date
+    fd, temp_path = tempfile.mkstemp(suffix='.temp', dir=os.path.dirname(tflite_path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(tflite_bytes)
+        os.replace(temp_path, tflite_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return tflite_path
+
+def bounding_box_feature(bounds, start_date, end_date, model_name):
+    """Wrap region bounds in the GeoJSON Feature shown around a deployment.
+    
+    Args:
+        bounds (dict): GeoJSON Polygon with the region's bounding box
+        start_date (str): Start date of the imagery
+        end_date (str): End date of the imagery
+        model_name (str): Name of the deployed model
+        
+    Returns:
+        dict: GeoJSON Feature with the deployment metadata as properties
+    """
+    return {
+        'type': 'Feature',
+        'geometry': {
+            'type': 'Polygon',
+            'coordinates': bounds['coordinates']
+        },
+        'properties': {
+            'start_date': start_date,
+            'end_date': end_date,
+            'model_name': model_name
+        }
+    }
+
+def _prediction_features(geometries, confidences):
+    """Build GeoJSON features for predicted chip polygons.
+    
+    Coordinates are rounded to COORDINATE_PRECISION decimals, which roughly
+    halves the size of the serialized GeoJSON sent to clients and saved to disk.
+    
+    Args:
+        geometries (list): Shapely polygons of the positive chips
+        confidences (list): Model confidence for each polygon
+        
+    Returns:
+        list: GeoJSON Feature dicts with a confidence property
+    """
+    return [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[
+                    [round(x, COORDINATE_PRECISION), round(y, COORDINATE_PRECISION)]
+                    for x, y in geom.exterior.coords
+                ]]
+            },
+            "properties": {
+                "confidence": float(conf)
+            }
+        }
+        for geom, conf in zip(geometries, confidences)
+    ]
 
 class ModelDeployer:
-    def __init__(self, project_id, collection='S2', chip_size=512, ee_project="earth-engine-ck"):
+    def __init__(self, project_id, collection='S2', chip_size=512, ee_project="earth-engine-ck", job_id=None):
         """Initialize the model deployer.
         
         Args:
@@ -24,19 +293,19 @@ class ModelDeployer:
             collection (str): The satellite collection to use (default: 'S2')
             chip_size (int): Size of each chip in pixels (default: 512)
             ee_project (str): Google Earth Engine project ID (default: "earth-engine-ck")
+            job_id (str, optional): Deployment job ID. When given, it is attached
+                to every record the deployer logs, so handlers can keep only their
+                own job's records.
         """
         self.project_id = project_id
         self.collection = collection
         self.chip_size = chip_size
         self.ee_project = ee_project
-        self.logger = logging.getLogger(__name__)
+        self.logger = logging.LoggerAdapter(logging.getLogger(__name__), {'job_id': job_id})
         
         # Initialize Earth Engine
         try:
-            ee.Initialize(
-                opt_url="https://earthengine-highvolume.googleapis.com",
-                project=ee_project,
-            )
+            initialize_earth_engine(ee_project)
             self.logger.info("Earth Engine initialized successfully")
         except Exception as e:
             self.logger.error(f"Failed to initialize Earth Engine: {e}")
@@ -79,9 +348,12 @@ class ModelDeployer:
         else:
             raise ValueError(f'Collection {self.collection} not recognized.')
     
-    def get_region_bounds(self, region):
+    @staticmethod
+    def get_region_bounds(region):
         """Convert GeoJSON region to Earth Engine geometry."""
         if isinstance(region, dict):
+            if region.get('type') == 'Feature':
+                region = region['geometry']
             # Convert GeoJSON to ee.Geometry
             if region['type'] == 'Polygon':
                 coordinates = region['coordinates'][0]  # Get first ring
@@ -103,8 +375,8 @@ class ModelDeployer:
         if not os.path.exists(metadata_path):
             raise FileNotFoundError(f"Model metadata not found at {metadata_path}")
             
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
+        with open(metadata_path, 'rb') as f:
+            metadata = orjson.loads(f.read())
             
         return metadata
     
@@ -172,10 +444,18 @@ class ModelDeployer:
         self.logger.info(f"Saved chip data to {output_file}")
         return output_file
 
-    def _process_tile(self, tile_info, model, pred_threshold, tries):
+    def _fetch_tile_chips(self, tile_info, input_shape, tries):
+        """Download a tile from Earth Engine and cut it into model-sized chips.
+        
+        Args:
+            tile_info (tuple): (x, y, corner coordinates, ee.Geometry) of the tile
+            input_shape (tuple): Model input shape without the batch dimension
+            tries (int): Number of attempts to fetch the tile's pixels
+            
+        Returns:
+            tuple: (stacked chips array or None, list of chip polygons)
+        """
         x, y, coords, tile_geom = tile_info
-        geometries = []
-        confidences = []
         
         # Extract lon/lat info early for aspect ratio calculation
         lon_min, lat_min, lon_max, lat_max = coords[0][0], coords[0][1], coords[2][0], coords[2][1]
@@ -189,7 +469,7 @@ class ModelDeployer:
                 
                 # Account for latitude distortion (optional but more accurate)
                 lat_mid = (lat_max + lat_min) / 2
-                aspect_ratio = aspect_ratio * np.cos(np.radians(lat_mid))
+                aspect_ratio = aspect_ratio * math.cos(math.radians(lat_mid))
                 
                 # Determine dimensions preserving aspect ratio
                 if aspect_ratio > 1:
@@ -226,17 +506,16 @@ class ModelDeployer:
             except Exception as e:
                 if attempt == tries - 1:
                     self.logger.warning(f"Failed to get data for tile at ({x}, {y}): {str(e)}")
-                    return [], []
+                    return None, []
                 continue
         
         if image_data is None:
-            return [], []
+            return None, []
         
         # Process the image data
         try:
-            # Get the model's expected input shape from the model itself
-            input_shape = model.input_shape[1:]  # Remove batch dimension
-            chip_size = input_shape[0]  # Use the model's expected size
+            # Use the model's expected size
+            chip_size = input_shape[0]
             
             # Break down the tile into chips
             stride = chip_size // 2  # 50% overlap between chips
@@ -277,39 +556,67 @@ class ModelDeployer:
                     chips.append(patch)
                     chip_geoms.append(chip_geom)
             
-            # Process chips in batches
-            if chips:
-                # Stack chips into a single array
-                chips_array = np.stack(chips)
-                
-                # Make predictions
-                predictions = model.predict(chips_array)
-                
-                # Process predictions
-                for pred, chip_geom in zip(predictions, chip_geoms):
-                    # Handle different prediction shapes
-                    if isinstance(pred, np.ndarray):
-                        if len(pred.shape) > 1:
-                            pred_value = pred[0][0] if pred.shape[1] > 1 else pred[0]
-                        else:
-                            pred_value = pred[0]
-                    else:
-                        pred_value = float(pred)
-                        
-                    if pred_value >= pred_threshold:
-                        # Use the bounding box polygon directly
-                        geometries.append(chip_geom)
-                        confidences.append(float(pred_value))
+            if not chips:
+                return None, []
+            
+            # Stack chips into a single array
+            return np.stack(chips), chip_geoms
         
         except Exception as e:
             self.logger.warning(f"Error processing tile at ({x}, {y}): {str(e)}")
+            return None, []
+
+    def _predict_chips(self, model, chip_arrays, chip_geoms, pred_threshold):
+        """Run the model on a batch of chips and keep those above the threshold.
+        
+        Args:
+            model: The model object to use for predictions
+            chip_arrays (list): Arrays of chips stacked along the batch dimension,
+                e.g. one per tile; they are not concatenated into one copy
+            chip_geoms (list): Polygon for each chip, in the order of chip_arrays
+            pred_threshold (float): Threshold for positive predictions
+            
+        Returns:
+            tuple: (list of positive chip polygons, list of their confidences)
+        """
+        geometries = []
+        confidences = []
+        
+        try:
+            # Make predictions in fixed-size chunks through the traced model function
+            # (TFLite models are called directly)
+            infer = model if isinstance(model, TFLiteModel) else _inference_function(model)
+            predictions = np.concatenate([
+                np.asarray(infer(chunk))
+                for chunk in _chip_chunks(chip_arrays, INFERENCE_CHUNK_SIZE)
+            ])
+            
+            # Process predictions
+            for pred, chip_geom in zip(predictions, chip_geoms):
+                # Handle different prediction shapes
+                if isinstance(pred, np.ndarray):
+                    if len(pred.shape) > 1:
+                        pred_value = pred[0][0] if pred.shape[1] > 1 else pred[0]
+                    else:
+                        pred_value = pred[0]
+                else:
+                    pred_value = float(pred)
+                    
+                if pred_value >= pred_threshold:
+                    # Use the bounding box polygon directly
+                    geometries.append(chip_geom)
+                    confidences.append(float(pred_value))
+        
+        except Exception as e:
+            self.logger.warning(f"Error predicting batch of {len(chip_geoms)} chips: {str(e)}")
             return [], []
             
         return geometries, confidences
 
     def make_predictions(self, model, region, start_date, end_date, 
                         pred_threshold=0.5, clear_threshold=0.75,
-                        progress_callback=None, model_name=None):
+                        progress_callback=None, model_name=None, max_workers=10,
+                        inference_batch_size=16, region_bounds=None):
         """Make predictions using the trained model.
         
         Args:
@@ -321,7 +628,17 @@ class ModelDeployer:
             clear_threshold: Threshold for cloud-free imagery
             progress_callback: Callback function for progress updates
             model_name: Name of the model (from filename)
+            max_workers: Number of tiles fetched from Earth Engine concurrently
+            inference_batch_size: Most fetched tiles whose chips are run through
+                the model together; inference also starts as soon as the buffered
+                tiles hold INFERENCE_CHUNK_SIZE chips
+            region_bounds: Bounding box of the region as a GeoJSON Polygon, if
+                already computed by the caller
+                
+        Returns:
+            int: Number of predictions saved (0 if the deployment failed)
         """
+        partial_file = None
         try:
             # Create predictions directory if it doesn't exist
             predictions_dir = os.path.join(PROJECTS_DIR, self.project_id, 'predictions')
@@ -330,6 +647,7 @@ class ModelDeployer:
             # Generate a unique filename based on timestamp
             timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
             output_file = os.path.join(predictions_dir, f'predictions_{timestamp}.geojson')
+            partial_file = f'{output_file}.part'
             
             # Get satellite collection and check for images - optimized to reduce Earth Engine API calls
             self.logger.info(f"Retrieving {self.collection} collection for date range {start_date} to {end_date}")
@@ -351,20 +669,15 @@ class ModelDeployer:
             scale = PIXEL_SIZE[self.collection]
             self.logger.info(f"Using scale: {scale} meters per pixel")
             
-            # Get region bounds
-            bounds = region_ee.bounds().getInfo()
+            # Get region bounds, reusing the caller's if provided
+            bounds = region_bounds or get_region_bounds_info(region)
             coords = bounds['coordinates'][0]
             
-            # Calculate dimensions in meters
-            width_meters = abs(coords[2][0] - coords[0][0])  # longitude difference in degrees
-            height_meters = abs(coords[2][1] - coords[0][1])  # latitude difference in degrees
-            
-            # Convert to meters (approximate conversion)
-            meters_per_degree_lat = 111320  # at equator
-            meters_per_degree_lon = meters_per_degree_lat * np.cos(np.mean([coords[0][1], coords[2][1]]) * np.pi / 180)
-            
-            width_meters = width_meters * meters_per_degree_lon
-            height_meters = height_meters * meters_per_degree_lat
+            # Calculate dimensions in meters (approximate conversion from degrees)
+            lat_center = 0.5 * (coords[0][1] + coords[2][1])
+            meters_per_degree_lon = METERS_PER_DEGREE_LAT * math.cos(math.radians(lat_center))
+            width_meters = abs(coords[2][0] - coords[0][0]) * meters_per_degree_lon
+            height_meters = abs(coords[2][1] - coords[0][1]) * METERS_PER_DEGREE_LAT
             
             self.logger.info(f"Region dimensions: {width_meters:.2f}m x {height_meters:.2f}m")
             
@@ -390,9 +703,7 @@ class ModelDeployer:
             
             self.logger.info(f"Processing {total_tiles} tiles ({n_tiles_x} x {n_tiles_y})")
             
-            # Initialize lists for storing predictions
-            all_geometries = []
-            all_confidences = []
+            num_predictions = 0
             processed_tiles = 0
             
             # Use the provided model_name or a default
@@ -400,152 +711,150 @@ class ModelDeployer:
                 model_name = 'deployed_model'
             
             # Create bounding box as a GeoJSON feature for the region
-            bounding_box = {
-                'type': 'Feature',
-                'geometry': {
-                    'type': 'Polygon',
-                    'coordinates': bounds['coordinates']
-                },
-                'properties': {
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'model_name': model_name
+            bounding_box = bounding_box_feature(bounds, start_date, end_date, model_name)
+            
+            # Prepare tile information for parallel processing. Tile edges in degrees
+            # are computed once per axis; tile x spans lon_edges[x]..lon_edges[x + 1].
+            lon_edges = (coords[0][0] + np.arange(n_tiles_x + 1) * (coords[2][0] - coords[0][0]) / n_tiles_x).tolist()
+            lat_edges = (coords[0][1] + np.arange(n_tiles_y + 1) * (coords[2][1] - coords[0][1]) / n_tiles_y).tolist()
+            
+            # Create tile info tuples (row-major: y outer, x inner) with all necessary data
+            tile_infos = [
+                (
+                    x, y,
+                    [[lon_min, lat_min], [lon_max, lat_min], [lon_max, lat_max], [lon_min, lat_max]],
+                    ee.Geometry.Rectangle([lon_min, lat_min, lon_max, lat_max])
+                )
+                for y, (lat_min, lat_max) in enumerate(zip(lat_edges[:-1], lat_edges[1:]))
+                for x, (lon_min, lon_max) in enumerate(zip(lon_edges[:-1], lon_edges[1:]))
+            ]
+            
+            # Model input shape without the batch dimension
+            input_shape = model.input_shape[1:]
+            
+            # Stream predicted features straight into the output GeoJSON as batches
+            # complete, rather than holding every prediction in memory until the end.
+            # Metadata is written up front as top-level properties. The file is only
+            # moved into place once complete, so a failed run leaves no partial file.
+            properties = {
+                "start_date": start_date,
+                "end_date": end_date,
+                "model_name": model_name,
+                "region_bounds": {
+                    "type": "Polygon",
+                    "coordinates": bounds['coordinates']
                 }
             }
-            
-            # Prepare tile information for parallel processing
-            tile_infos = []
-            for y in range(n_tiles_y):
-                for x in range(n_tiles_x):
-                    # Calculate tile bounds in degrees
-                    lon_min = coords[0][0] + x * (coords[2][0] - coords[0][0]) / n_tiles_x
-                    lat_min = coords[0][1] + y * (coords[2][1] - coords[0][1]) / n_tiles_y
-                    lon_max = coords[0][0] + (x + 1) * (coords[2][0] - coords[0][0]) / n_tiles_x
-                    lat_max = coords[0][1] + (y + 1) * (coords[2][1] - coords[0][1]) / n_tiles_y
-                    
-                    # Create tile geometry
-                    tile_geom = ee.Geometry.Rectangle([lon_min, lat_min, lon_max, lat_max])
-                    
-                    # Create tile info tuple with all necessary data
-                    tile_info = (x, y, [[lon_min, lat_min], [lon_max, lat_min], [lon_max, lat_max], [lon_min, lat_max]], tile_geom)
-                    tile_infos.append(tile_info)
-            
-            # Process tiles in parallel using batches
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                # Process in batches to avoid overwhelming Earth Engine
-                for batch_start in range(0, len(tile_infos), 500):
-                    batch_end = min(batch_start + 500, len(tile_infos))
-                    batch = tile_infos[batch_start:batch_end]
-                    
-                    # Submit batch of tiles for processing
-                    futures = [executor.submit(self._process_tile, tile_info, model, pred_threshold, 2) 
-                               for tile_info in batch]
+            with open(partial_file, 'wb') as out:
+                out.write(b'{"type":"FeatureCollection","properties":' + orjson.dumps(properties) + b',"features":[')
+                
+                # Fetch tiles in parallel, keeping a bounded number of downloads running
+                # ahead of inference so Earth Engine I/O overlaps with model prediction
+                # without holding an unbounded number of fetched tiles in memory.
+                # Chips from several fetched tiles are run through the model in a single
+                # predict call.
+                prefetch_depth = 2 * max_workers
+                tile_iter = iter(tile_infos)
+                pending_chips = []
+                pending_chip_count = 0
+                pending_tiles = 0
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    in_flight = {executor.submit(self._fetch_tile_chips, tile_info, input_shape, 2)
+                                 for tile_info in itertools.islice(tile_iter, prefetch_depth)}
                     
-                    # Collect results as they complete
-                    for future in concurrent.futures.as_completed(futures):
-                        geometries, confidences = future.result()
-                        all_geometries.extend(geometries)
-                        all_confidences.extend(confidences)
+                    while in_flight:
+                        done, in_flight = concurrent.futures.wait(
+                            in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                        )
                         
-                        processed_tiles += 1
+                        # Top the window back up before running inference
+                        for tile_info in itertools.islice(tile_iter, len(done)):
+                            in_flight.add(executor.submit(self._fetch_tile_chips, tile_info, input_shape, 2))
                         
-                        # Send incremental prediction updates to the frontend
-                        if progress_callback and geometries:
-                            # Create a GeoJSON feature collection for the new predictions
-                            new_predictions = {
-                                "type": "FeatureCollection",
-                                "features": [
-                                    {
-                                        "type": "Feature",
-                                        "geometry": {
-                                            "type": "Polygon",
-                                            "coordinates": [list(geom.exterior.coords)]
-                                        },
-                                        "properties": {
-                                            "confidence": float(conf)
-                                        }
+                        for future in done:
+                            chips_array, chip_geoms = future.result()
+                            if chips_array is not None:
+                                pending_chips.append((chips_array, chip_geoms))
+                                pending_chip_count += len(chips_array)
+                            pending_tiles += 1
+                            
+                            # Run inference once enough tiles or a full inference chunk of
+                            # chips are buffered, or on the last tile, so buffered chips
+                            # stay bounded by the chunk size rather than the tile count
+                            if (pending_tiles < inference_batch_size
+                                    and pending_chip_count < INFERENCE_CHUNK_SIZE
+                                    and processed_tiles + pending_tiles < total_tiles):
+                                continue
+                            
+                            geometries, confidences = [], []
+                            if pending_chips:
+                                geometries, confidences = self._predict_chips(
+                                    model,
+                                    [chips for chips, _ in pending_chips],
+                                    [geom for _, geoms in pending_chips for geom in geoms],
+                                    pred_threshold
+                                )
+                            
+                            # Append the new features to the output file
+                            features = _prediction_features(geometries, confidences)
+                            if features:
+                                separator = b',' if num_predictions else b''
+                                out.write(separator + b','.join(orjson.dumps(feature) for feature in features))
+                                num_predictions += len(features)
+                            
+                            processed_tiles += pending_tiles
+                            pending_chips = []
+                            pending_chip_count = 0
+                            pending_tiles = 0
+                            
+                            # Send incremental prediction updates to the frontend
+                            if progress_callback and features:
+                                # Create a GeoJSON feature collection for the new predictions
+                                new_predictions = {
+                                    "type": "FeatureCollection",
+                                    "features": features,
+                                    "properties": {
+                                        "start_date": start_date,
+                                        "end_date": end_date,
+                                        "model_name": model_name
                                     }
-                                    for geom, conf in zip(geometries, confidences)
-                                ],
-                                "properties": {
-                                    "start_date": start_date,
-                                    "end_date": end_date,
-                                    "model_name": model_name
                                 }
-                            }
-                            
-                            # Call the progress callback with the new predictions
-                            progress_callback(
-                                processed_tiles, 
-                                total_tiles, 
-                                incremental_predictions=new_predictions,
-                                bounding_box=bounding_box
-                            )
-                        elif progress_callback:
-                            # Just update progress if no new predictions
-                            progress_callback(processed_tiles, total_tiles)
-            
-            # Create GeoDataFrame from predictions
-            if all_geometries:
-                # Create GeoDataFrame with the bounding box polygons
-                gdf = gpd.GeoDataFrame({
-                    'geometry': all_geometries,
-                    'confidence': all_confidences
-                }, crs="EPSG:4326")
-                
-                # Save predictions to file
-                gdf.to_file(output_file, driver='GeoJSON')
-                
-                # Now add the metadata to the saved GeoJSON file
-                with open(output_file, 'r') as f:
-                    geojson_data = json.load(f)
-                
-                # Add metadata as top-level properties
-                geojson_data["properties"] = {
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "model_name": model_name,
-                    "region_bounds": {
-                        "type": "Polygon",
-                        "coordinates": bounds['coordinates']
-                    }
-                }
-                
-                # Write the updated GeoJSON back to the file
-                with open(output_file, 'w') as f:
-                    json.dump(geojson_data, f)
+                                
+                                # Call the progress callback with the new predictions
+                                progress_callback(
+                                    processed_tiles, 
+                                    total_tiles, 
+                                    incremental_predictions=new_predictions,
+                                    bounding_box=bounding_box
+                                )
+                            elif progress_callback:
+                                # Just update progress if no new predictions
+                                progress_callback(processed_tiles, total_tiles)
                 
-                self.logger.info(f"Saved {len(gdf)} predictions as bounding boxes to {output_file}")
-                return gdf
+                out.write(b']}')
+            os.replace(partial_file, output_file)
+            
+            # Save the metadata alongside, so previous predictions can be listed and
+            # served without parsing every GeoJSON file
+            metadata = {
+                "model_name": model_name,
+                "start_date": start_date,
+                "end_date": end_date,
+                "feature_count": num_predictions,
+                "region_bounds": properties["region_bounds"]
+            }
+            write_file_atomic(output_file.replace('.geojson', '_metadata.json'), orjson.dumps(metadata))
+            
+            if num_predictions:
+                self.logger.info(f"Saved {num_predictions} predictions as bounding boxes to {output_file}")
             else:
                 self.logger.info("No predictions met the confidence threshold.")
-                # Return empty GeoDataFrame with correct structure that will properly convert to GeoJSON
-                empty_gdf = gpd.GeoDataFrame(columns=['geometry', 'confidence'], geometry='geometry', crs="EPSG:4326")
-                
-                # Create an empty GeoJSON with metadata
-                empty_geojson = {
-                    "type": "FeatureCollection",
-                    "features": [],
-                    "properties": {
-                        "start_date": start_date,
-                        "end_date": end_date,
-                        "model_name": model_name,
-                        "region_bounds": {
-                            "type": "Polygon",
-                            "coordinates": bounds['coordinates']
-                        }
-                    }
-                }
-                
-                # Save the empty GeoJSON with metadata
-                with open(output_file, 'w') as f:
-                    json.dump(empty_geojson, f)
-                
-                return empty_gdf
+            return num_predictions
                 
         except Exception as e:
             self.logger.error(f"Error during prediction: {str(e)}")
             self.logger.error(f"Exception details: {traceback.format_exc()}")
-            # Return empty GeoDataFrame in case of error to avoid breaking the UI
-            empty_gdf = gpd.GeoDataFrame(columns=['geometry', 'confidence'], geometry='geometry', crs="EPSG:4326")
-            return empty_gdf
\ No newline at end of file
+            if partial_file and os.path.exists(partial_file):
+                os.remove(partial_file)
+            # Report no predictions in case of error to avoid breaking the UI
+            return 0
\ No newline at end of file
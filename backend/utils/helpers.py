@@ -5,21 +5,66 @@ import os
 import logging
 import json
 import datetime
+import gzip
+import tempfile
 import numpy as np
+import orjson
+from flask import Response, request
 from shapely.geometry import Point
 
 logger = logging.getLogger(__name__)
 
-class NumpyEncoder(json.JSONEncoder):
-    """JSON encoder that can handle NumPy data types."""
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super(NumpyEncoder, self).default(obj)
+# JSON bodies at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = 64 * 1024
+
+def json_response(payload, status=200):
+    """
+    Build a JSON response serialized with orjson.
+    
+    Much faster than jsonify for large, coordinate-heavy payloads such as
+    GeoJSON, and serializes NumPy scalars and arrays natively. Large bodies are
+    gzip-compressed when the client accepts it.
+    
+    Args:
+        payload (dict | bytes): Data to serialize, or an already encoded JSON body
+        status (int, optional): HTTP status code. Defaults to 200.
+        
+    Returns:
+        Response: Flask response with an application/json body
+    """
+    if isinstance(payload, bytes):
+        body = payload
+    else:
+        body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    response = Response(status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+        body = gzip.compress(body, compresslevel=5)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_data(body)
+    return response
+
+def write_file_atomic(file_path, data):
+    """
+    Replace a file's contents atomically.
+    
+    The data goes to a uniquely named temporary file in the same directory, which
+    is then swapped in with os.replace. Concurrent readers see either the old or
+    the new contents, and concurrent writers never share a temporary file.
+    
+    Args:
+        file_path (str): Path to the file to write
+        data (bytes): New contents
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
 def ensure_directory(directory_path):
     """
@@ -106,6 +151,96 @@ def load_geojson(file_path):
         logger.error(f"Error loading GeoJSON file {file_path}: {e}")
         raise
 
+def _is_number(value):
+    """Check for an int or float coordinate value, excluding bools."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _position_array(positions):
+    """Convert a list of GeoJSON positions to an (n, 2) array of their x/y values."""
+    for position in positions:
+        if (not isinstance(position, (list, tuple)) or len(position) < 2
+                or not _is_number(position[0]) or not _is_number(position[1])):
+            raise ValueError(f'Invalid coordinate position: {position!r}')
+    return np.asarray([position[:2] for position in positions], dtype=np.float64)
+
+def _coordinate_arrays(coords):
+    """Yield (n, 2) arrays of the x/y positions in a GeoJSON coordinates array.
+    
+    Missing or empty top-level coordinates yield nothing.
+    
+    Raises:
+        ValueError: If the array holds anything other than nested lists of
+            numeric positions, or a nested array is empty
+    """
+    if coords is None or (isinstance(coords, (list, tuple)) and not coords):
+        return
+    yield from _nested_coordinate_arrays(coords)
+
+def _nested_coordinate_arrays(coords):
+    """Walk a non-empty coordinates array down to its numeric positions."""
+    if not isinstance(coords, (list, tuple)):
+        raise ValueError(f'Invalid coordinates: expected a list, got {type(coords).__name__}')
+    if not coords:
+        raise ValueError('Invalid coordinates: empty coordinate array')
+    if _is_number(coords[0]):
+        yield _position_array([coords])
+    elif isinstance(coords[0], (list, tuple)) and coords[0] and _is_number(coords[0][0]):
+        yield _position_array(coords)
+    else:
+        for part in coords:
+            yield from _nested_coordinate_arrays(part)
+
+def geometry_bounds(geometry):
+    """
+    Compute the bounding box of a single GeoJSON geometry or Feature.
+    
+    Args:
+        geometry (dict): GeoJSON geometry, or a Feature wrapping one
+        
+    Returns:
+        tuple: (minx, miny, maxx, maxy), or None if there are no coordinates
+        
+    Raises:
+        ValueError: If the coordinates are malformed, e.g. non-numeric or empty rings
+    """
+    if geometry.get('type') == 'Feature':
+        geometry = geometry.get('geometry') or {}
+    arrays = list(_coordinate_arrays(geometry.get('coordinates')))
+    if not arrays:
+        return None
+    positions = np.concatenate(arrays)
+    minx, miny = positions.min(axis=0).tolist()
+    maxx, maxy = positions.max(axis=0).tolist()
+    return minx, miny, maxx, maxy
+
+def geojson_bounds(geojson):
+    """
+    Compute the bounding box of all features in a GeoJSON FeatureCollection.
+    
+    Reduces the raw coordinate arrays with NumPy instead of building a
+    geometry object per feature.
+    
+    Args:
+        geojson (dict): GeoJSON FeatureCollection
+        
+    Returns:
+        tuple: (minx, miny, maxx, maxy), or None if there are no coordinates
+        
+    Raises:
+        ValueError: If any feature's coordinates are malformed
+    """
+    arrays = [
+        array
+        for feature in geojson.get('features', [])
+        for array in _coordinate_arrays((feature.get('geometry') or {}).get('coordinates'))
+    ]
+    if not arrays:
+        return None
+    positions = np.concatenate(arrays)
+    minx, miny = positions.min(axis=0).tolist()
+    maxx, maxy = positions.max(axis=0).tolist()
+    return minx, miny, maxx, maxy
+
 def geojson_to_points(geojson):
     """
     Convert GeoJSON to a list of points with attributes.
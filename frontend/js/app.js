@@ -125,6 +125,13 @@ class App {
     // Connect to socket.io server
     socketService.connect();
     
+    // Only receive job events for the project that is open
+    store.on('currentProjectId', (projectId) => {
+      if (projectId) {
+        socketService.joinProject(projectId);
+      }
+    });
+    
     // Listen for extraction progress updates
     socketService.on('extraction_progress', (data) => {
       store.updateExtractionProgress(data);
@@ -160,6 +167,11 @@ class App {
       store.updateDeploymentProgress(data);
     });
     
+    // Listen for batches of newly predicted features
+    socketService.on('deployment_feature_batch', (data) => {
+      store.handleDeploymentFeatureBatch(data);
+    });
+    
     // Listen for deployment completion
     socketService.on('deployment_complete', (data) => {
       store.handleDeploymentComplete(data);
@@ -176,8 +188,8 @@ class App {
     });
     
     // Listen for deployment logs
-    socketService.on('deployment_log', (data) => {
-      console.log('Deployment log:', data.message);
+    socketService.on('deployment_log_batch', (data) => {
+      data.messages.forEach(message => console.log('Deployment log:', message));
     });
   }
   
@@ -287,9 +299,6 @@ class App {
         });
       }
     });
-    
-    // Socket events
-    this.connectSocketEvents();
   }
   
   initializeState() {
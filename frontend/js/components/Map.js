@@ -211,7 +211,10 @@ class Map extends EventEmitter {
     
     // Listen for deployment completion
     store.on('deploymentComplete', data => {
-      this.displayDeploymentPredictions(data.predictions, data.boundingBox);
+      // Predictions were streamed in during deployment; make sure the layers
+      // exist even if nothing was found, then switch to the final styling
+      this.updateDeploymentPredictions({ type: 'FeatureCollection', features: [] }, data.boundingBox);
+      this.mapInstance.setPaintProperty('deployment-predictions-line', 'line-color', '#FFCE00');
     });
     
     // Listen for prediction loaded
@@ -593,7 +596,7 @@ class Map extends EventEmitter {
       // Add the image as a raster source to the map
       this.mapInstance.addSource(sourceId, {
         'type': 'image',
-        'url': `data:image/png;base64,${patch.image}`,
+        'url': `data:${patch.image_mime || 'image/png'};base64,${patch.image}`,
         'coordinates': [
           [bounds[0][0], bounds[1][1]], // Top left (NW)
           [bounds[1][0], bounds[1][1]], // Top right (NE)
@@ -153,9 +153,10 @@ class ApiService {
    * @param {string} file - Extraction file
    * @param {string} visType - Visualization type
    * @param {string} pointId - Optional specific point ID to visualize
+   * @param {Object} options - Optional page of patches ({ limit, offset }) and image format ({ format: 'png' | 'jpeg' })
    * @returns {Promise<Object>} - Visualization data
    */
-  async getPatchVisualization(projectId, file, visType, pointId) {
+  async getPatchVisualization(projectId, file, visType, pointId, options = {}) {
     const params = { 
       project_id: projectId, 
       file, 
@@ -167,6 +168,17 @@ class ApiService {
       params.point_id = pointId;
     }
     
+    // Add paging and image format if provided
+    if (options.limit !== undefined) {
+      params.limit = options.limit;
+    }
+    if (options.offset !== undefined) {
+      params.offset = options.offset;
+    }
+    if (options.format) {
+      params.format = options.format;
+    }
+    
     return this.get('get_patch_visualization', params);
   }
   
@@ -247,13 +259,41 @@ class ApiService {
    * Get deployment tiles information for a region
    * @param {string} projectId - Project ID
    * @param {Object} region - GeoJSON region object
-   * @returns {Promise<Object>} - JSON response with tile information
+   * @returns {Promise<Object>} - JSON response with tile information, with the
+   *   compact tile arrays expanded into GeoJSON features under `tiles`
    */
   async getDeploymentTiles(projectId, region) {
-    return this.get('get_deployment_tiles', {
+    const result = await this.get('get_deployment_tiles', {
       project_id: projectId,
       region: JSON.stringify(region)
     });
+    
+    if (result.success) {
+      const utmCrs = result.dimensions.crs.projected;
+      result.tiles = result.tile_coords.map((ring, i) => {
+        const [x, y] = result.tile_indices[i];
+        const [xMin, yMin, xMax, yMax] = result.tile_bounds_utm[i];
+        return {
+          type: 'Feature',
+          geometry: {
+            type: 'Polygon',
+            coordinates: [ring]
+          },
+          properties: {
+            tile_id: `${x}_${y}`,
+            x,
+            y,
+            x_min_utm: xMin,
+            y_min_utm: yMin,
+            x_max_utm: xMax,
+            y_max_utm: yMax,
+            utm_crs: utmCrs
+          }
+        };
+      });
+    }
+    
+    return result;
   }
 }
 
@@ -8,12 +8,19 @@ class SocketService extends EventEmitter {
     this.apiUrl = config.API_URL;
     this.socket = null;
     this.connected = false;
+    this.projectId = null;
     
     // Connect to Socket.IO server
     this.connect();
   }
   
   connect() {
+    // Reuse the existing connection; a second io() call would open another
+    // socket and deliver every server event twice
+    if (this.socket) {
+      return;
+    }
+    
     try {
       this.socket = io(this.apiUrl);
       
@@ -21,6 +28,12 @@ class SocketService extends EventEmitter {
       this.socket.on('connect', () => {
         console.log('Socket.IO connected with ID:', this.socket.id);
         this.connected = true;
+        
+        // Rooms are per-connection, so rejoin after a reconnect
+        if (this.projectId) {
+          this.socket.emit('join_project', { project_id: this.projectId });
+        }
+        
         this.emit('connected', this.socket.id);
       });
       
@@ -77,12 +90,16 @@ class SocketService extends EventEmitter {
       this.emit('deployment_progress', data);
     });
     
+    this.socket.on('deployment_feature_batch', (data) => {
+      this.emit('deployment_feature_batch', data);
+    });
+    
     this.socket.on('deployment_complete', (data) => {
       this.emit('deployment_complete', data);
     });
     
-    this.socket.on('deployment_log', (data) => {
-      this.emit('deployment_log', data);
+    this.socket.on('deployment_log_batch', (data) => {
+      this.emit('deployment_log_batch', data);
     });
     
     this.socket.on('deployment_error', (data) => {
@@ -101,6 +118,12 @@ class SocketService extends EventEmitter {
     }
   }
   
+  // Subscribe to the server-side room for a project's job events
+  joinProject(projectId) {
+    this.projectId = projectId;
+    return this.send('join_project', { project_id: projectId });
+  }
+  
   // Disconnect the socket
   disconnect() {
     if (this.socket) {
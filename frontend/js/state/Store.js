@@ -509,11 +509,13 @@ class Store extends EventEmitter {
       percent: percent,
       message: data.status || `Processing (${percent}%)`
     });
-    
-    // If there are incremental predictions, emit an event
-    if (data.incremental_predictions && data.incremental_predictions.features) {
+  }
+  
+  // Handle a batch of newly predicted features streamed during deployment
+  handleDeploymentFeatureBatch(data) {
+    if (data.predictions && data.predictions.features) {
       this.emit('deploymentIncrementalUpdate', {
-        predictions: data.incremental_predictions,
+        predictions: data.predictions,
         boundingBox: data.bounding_box
       });
     }
@@ -533,16 +535,16 @@ class Store extends EventEmitter {
       deployBtn.disabled = false;
     }
     
-    // Emit an event with the predictions
+    // Emit an event with the summary (features were already streamed in batches)
     this.emit('deploymentComplete', {
-      predictions: data.predictions,
+      numPredictions: data.num_predictions,
       boundingBox: data.bounding_box
     });
     
     // Show success notification
     this.emit('notification', {
       type: 'success',
-      message: `Deployment complete: ${data.predictions?.features?.length || 0} predictions displayed`
+      message: `Deployment complete: ${data.num_predictions || 0} predictions displayed`
     });
   }
   